@@ -1,19 +1,214 @@
 import numpy as np
 from tensorflow.keras.models import load_model
 import os
+import threading
+import time
+from datetime import datetime
 from tensorflow.keras.losses import MeanSquaredError
 
+try:
+    from .model_registry import ModelRegistry, DEFAULT_SCALING, BUILTIN_VERSION
+except ImportError:
+    # Direct import for development
+    from model_registry import ModelRegistry, DEFAULT_SCALING, BUILTIN_VERSION
+
+# Model shipped with the repository, served unless another version is activated
+BUILTIN_MODEL_PATH = os.path.join(os.path.dirname(__file__), "ann_scholarship_model.h5")
+
+# How often every server process checks the registry for a newly activated version
+ANN_ACTIVE_POLL_SECONDS = float(os.environ.get('ANN_ACTIVE_POLL_SECONDS', 10))
+
+SCHOLARSHIP_TYPES = ('Vocational Training Grant', 'Academic Scholarship', 'Research Grant')
+
+
+class ModelBundle:
+    """A loaded model together with the normalization constants it was trained with"""
+
+    def __init__(self, version, model, metadata):
+        self.version = version
+        self.model = model
+        self.metadata = metadata
+        self.x_min = np.array(metadata['x_min'], dtype=float)  # Minimum values for each input feature
+        self.x_max = np.array(metadata['x_max'], dtype=float)  # Maximum values for each input feature
+        self.y_min = np.array(metadata['y_min'], dtype=float)  # Minimum values for output
+        self.y_max = np.array(metadata['y_max'], dtype=float)  # Maximum values for output
+        self.loaded_at = datetime.now().isoformat()
+
+
 class ANNPredictor:
-    def __init__(self):
-        # Load model
-        model_path = os.path.join(os.path.dirname(__file__), "ann_scholarship_model.h5")
-        self.model = load_model(model_path, custom_objects={'mse': MeanSquaredError()})
-        
-        # Normalization parameters - these should match values used during training
-        self.x_min = np.array([1, 1, 1])  # Minimum values for each input feature
-        self.x_max = np.array([3, 3, 3])  # Maximum values for each input feature
-        self.y_min = np.array([1, 1])     # Minimum values for output
-        self.y_max = np.array([3, 3])     # Maximum values for output
+    def __init__(self, registry=None):
+        self.registry = registry or ModelRegistry()
+
+        # The active bundle is only ever replaced by a single reference assignment,
+        # so a request that already picked up a bundle finishes on that bundle
+        active = self.registry.get_active()
+        self._bundle = self._load_bundle(active)
+        self._previous = None
+
+        # Guards swaps and the background loading state
+        self._lock = threading.Lock()
+        self._loading = None
+        self._last_error = None
+
+        # Last active version of the registry acted upon by the watcher
+        self._watched = active
+        self._watcher = None
+
+    @property
+    def version(self):
+        return self._bundle.version
+
+    @property
+    def model(self):
+        return self._bundle.model
+
+    @property
+    def x_min(self):
+        return self._bundle.x_min
+
+    @property
+    def x_max(self):
+        return self._bundle.x_max
+
+    @property
+    def y_min(self):
+        return self._bundle.y_min
+
+    @property
+    def y_max(self):
+        return self._bundle.y_max
+
+    def _load_bundle(self, version):
+        """Load a model version and run a warm-up prediction before it serves traffic"""
+        if version == BUILTIN_VERSION:
+            model_path = BUILTIN_MODEL_PATH
+            metadata = dict(DEFAULT_SCALING)
+        else:
+            model_path = self.registry.model_path(version)
+            metadata = self.registry.load_metadata(version)
+
+        model = load_model(model_path, custom_objects={'mse': MeanSquaredError()})
+        bundle = ModelBundle(version, model, metadata)
+
+        # Warm up so the first real request doesn't pay for graph tracing
+        warmup_input = (bundle.x_min + bundle.x_max) / 2
+        warmup_input = ((warmup_input - bundle.x_min) / (bundle.x_max - bundle.x_min))[np.newaxis, :]
+        model.predict(warmup_input, verbose=0)
+        model(warmup_input, training=False)
+
+        return bundle
+
+    def _swap(self, bundle):
+        with self._lock:
+            self._previous = self._bundle
+            self._bundle = bundle
+
+    def activate(self, version, background=True, persist=True):
+        """
+        Load, warm up and swap in a model version.
+
+        Args:
+            version (str): Registered version, or 'builtin'
+            background (bool): Load in a background thread and return immediately
+            persist (bool): Record the version as active in the registry, so that the
+                other server processes and restarted ones switch to it too
+
+        Returns:
+            bool: False if another version is still being loaded
+        """
+        if version != BUILTIN_VERSION:
+            # Fail fast on unknown versions and bad metadata
+            self.registry.load_metadata(version)
+
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = version
+            self._last_error = None
+
+        def load_and_swap():
+            try:
+                bundle = self._load_bundle(version)
+                self._swap(bundle)
+                if persist:
+                    self._watched = version
+                    self.registry.set_active(version)
+            except Exception as e:
+                self._last_error = f'{version}: {str(e)}'
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        if background:
+            threading.Thread(target=load_and_swap, name=f'ann-load-{version}', daemon=True).start()
+        else:
+            load_and_swap()
+        return True
+
+    def rollback(self):
+        """
+        Swap back to the previously served version. The previous bundle is kept
+        in memory, so this is instant.
+
+        Returns:
+            str: The version now being served, or None if there is nothing to roll back to
+        """
+        with self._lock:
+            if self._previous is None:
+                return None
+            self._bundle, self._previous = self._previous, self._bundle
+            version = self._bundle.version
+
+        self._watched = version
+        self.registry.set_active(version)
+        return version
+
+    def sync_active(self):
+        """
+        Switch to the active version of the registry if another process changed it.
+        The version is loaded in the background; a version that fails to load is not
+        tried again until the active version changes once more.
+        """
+        active = self.registry.get_active()
+        if active == self._watched:
+            return
+        if active != self._bundle.version:
+            try:
+                if not self.activate(active, persist=False):
+                    # Still loading another version, check again next time
+                    return
+            except (KeyError, ValueError) as e:
+                self._last_error = f'{active}: {str(e)}'
+        self._watched = active
+
+    def start_watcher(self, interval=ANN_ACTIVE_POLL_SECONDS):
+        """Periodically pick up versions activated by other processes, in a daemon thread"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sync_active()
+                except Exception as e:
+                    self._last_error = f'{self.registry.get_active()}: {str(e)}'
+
+        self._watcher = threading.Thread(target=run, name='ann-active-watcher', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        """Describe the served, previous and loading versions"""
+        bundle = self._bundle
+        previous = self._previous
+        return {
+            'active': bundle.version,
+            'activeLoadedAt': bundle.loaded_at,
+            'previous': previous.version if previous is not None else None,
+            'loading': self._loading,
+            'lastError': self._last_error,
+            'available': [BUILTIN_VERSION] + self.registry.list_versions()
+        }
     
     def predict(self, poverty_rate, education_level, employment_rate):
         """
@@ -27,18 +222,22 @@ class ANNPredictor:
         Returns:
             dict: Dictionary containing eligibility score and scholarship type
         """
+        # Use one bundle for the whole prediction, even if a swap happens meanwhile
+        bundle = self._bundle
+
         # Convert inputs to appropriate format and scale
         input_data = np.array([[poverty_rate, education_level, employment_rate]])
         
         # Normalize input data
-        normalized_input = (input_data - self.x_min) / (self.x_max - self.x_min)
+        normalized_input = (input_data - bundle.x_min) / (bundle.x_max - bundle.x_min)
         
-        # Make prediction
-        prediction = self.model.predict(normalized_input)[0]
+        # Make prediction; calling the model directly skips the batching overhead of
+        # model.predict, which dominates the latency of a single input
+        prediction = np.asarray(bundle.model(normalized_input, training=False))[0]
         
         # Rescale outputs
-        eligibility = prediction[0] * (self.y_max[0] - self.y_min[0]) + self.y_min[0]
-        scholarship = prediction[1] * (self.y_max[1] - self.y_min[1]) + self.y_min[1]
+        eligibility = prediction[0] * (bundle.y_max[0] - bundle.y_min[0]) + bundle.y_min[0]
+        scholarship = prediction[1] * (bundle.y_max[1] - bundle.y_min[1]) + bundle.y_min[1]
         
         # Map scholarship type to a category based on value
         scholarship_type = self._get_scholarship_type(scholarship)
@@ -49,6 +248,65 @@ class ANNPredictor:
             'scholarship_type': scholarship_type
         }
     
+    def predict_batch(self, inputs, batch_size=4096):
+        """
+        Make predictions for many inputs at once.
+
+        Args:
+            inputs (array-like): Shape (n, 3) of poverty, education and employment values
+            batch_size (int): Rows per model call
+
+        Returns:
+            tuple: (eligibility, scholarship) arrays, rescaled like predict
+        """
+        bundle = self._bundle
+
+        normalized_input = (np.asarray(inputs, dtype=float) - bundle.x_min) / (bundle.x_max - bundle.x_min)
+        prediction = bundle.model.predict(normalized_input, batch_size=batch_size, verbose=0)
+
+        eligibility = prediction[:, 0] * (bundle.y_max[0] - bundle.y_min[0]) + bundle.y_min[0]
+        scholarship = prediction[:, 1] * (bundle.y_max[1] - bundle.y_min[1]) + bundle.y_min[1]
+        return eligibility, scholarship
+
+    def _get_scholarship_type_indices(self, scholarship_values):
+        """Index into SCHOLARSHIP_TYPES of the category of each scholarship value"""
+        scholarship_values = np.asarray(scholarship_values)
+        return np.select([scholarship_values < 1.5, scholarship_values < 2.5], [0, 1], 2)
+
+    def get_scholarship_types(self, scholarship_values):
+        """Vectorized counterpart of _get_scholarship_type"""
+        return np.array(SCHOLARSHIP_TYPES, dtype=object)[self._get_scholarship_type_indices(scholarship_values)]
+
+    def get_scholarship_weights(self, scholarship_values):
+        """
+        Weights of the scholarship types for raw scholarship scores (1-3).
+
+        Returns:
+            ndarray: (n, 3) weights summing to 1, ordered as SCHOLARSHIP_TYPES
+        """
+        scholarship_values = np.asarray(scholarship_values, dtype=float)
+
+        # Normalize scholarship score to 0-1 range
+        normalized_score = (scholarship_values - 1) / 2  # 1-3 → 0-1
+
+        # Calculate weights based on position in the spectrum
+        # Lower score (closer to 0) = more vocational
+        # Middle score (around 0.5) = more academic
+        # Higher score (closer to 1) = more research
+        weights = np.column_stack([
+            np.maximum(0, 1 - (2 * normalized_score)),  # Decreases as score increases
+            1 - np.abs(2 * normalized_score - 1),  # Peaks at 0.5
+            np.maximum(0, (2 * normalized_score) - 1)  # Increases as score increases
+        ])
+
+        # Ensure primary recommendation gets significant weight
+        recommended = self._get_scholarship_type_indices(scholarship_values)
+        rows = np.arange(len(weights))
+        weights[rows, recommended] = np.maximum(weights[rows, recommended], 0.5)
+
+        # Normalize weights to sum to 1
+        return weights / weights.sum(axis=1, keepdims=True)
+
     def _get_scholarship_type(self, scholarship_value):
         """Maps numerical scholarship value to a category"""
         if scholarship_value < 1.5:
@@ -89,31 +347,8 @@ class ANNPredictor:
         recommended_type = prediction['scholarship_type']
 
         # Calculate weights based on the scholarship score position
-        # Initialize weights dictionary
-        scholarship_types = {
-            'Vocational Training Grant': 0.0,
-            'Academic Scholarship': 0.0,
-            'Research Grant': 0.0
-        }
-
-        # Normalize scholarship score to 0-1 range
-        normalized_score = (scholarship_score - 1) / 2  # 1-3 → 0-1
-
-        # Calculate weights based on position in the spectrum
-        # Lower score (closer to 0) = more vocational
-        # Middle score (around 0.5) = more academic
-        # Higher score (closer to 1) = more research
-        scholarship_types['Vocational Training Grant'] = max(0, 1 - (2 * normalized_score))  # Decreases as score increases
-        scholarship_types['Academic Scholarship'] = 1 - abs(2 * normalized_score - 1)  # Peaks at 0.5
-        scholarship_types['Research Grant'] = max(0, (2 * normalized_score) - 1)  # Increases as score increases
-
-        # Ensure primary recommendation gets significant weight
-        scholarship_types[recommended_type] = max(scholarship_types[recommended_type], 0.5)
-
-        # Normalize weights to sum to 1
-        total_weight = sum(scholarship_types.values())
-        for key in scholarship_types:
-            scholarship_types[key] /= total_weight
+        weights = self.get_scholarship_weights([scholarship_score])[0]
+        scholarship_types = dict(zip(SCHOLARSHIP_TYPES, weights.tolist()))
         
         return {
             'country': country_data.get('name', 'Unknown'),
@@ -1,17 +1,196 @@
+import hashlib
+import json
+import os
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 
+# Membership function configuration written by fis_tuning.py; the hand-picked
+# membership functions below are used when unset
+FIS_MF_CONFIG = os.environ.get('FIS_MF_CONFIG')
+
+# Universe bounds (inclusive, step 1) of each fuzzy variable
+UNIVERSES = {
+    'poverty': (0, 60),
+    'education': (0, 100),
+    'employment': (0, 80),
+    'eligibility': (0, 100),
+    'scholarship_type': (0, 100)
+}
+
+# Membership functions of each variable: term -> (shape, breakpoints)
+MEMBERSHIP_FUNCTIONS = {
+    'poverty': {
+        'low': ('trimf', [0, 5, 15]),
+        'medium': ('trapmf', [10, 15, 40, 50]),
+        'high': ('trimf', [40, 50, 60])
+    },
+    'education': {
+        'below_upper': ('trimf', [0, 0, 33]),
+        'upper_second': ('trimf', [25, 50, 75]),
+        'tertiary': ('trimf', [67, 100, 100])
+    },
+    'employment': {
+        'low': ('trimf', [0, 15, 20]),
+        'medium': ('trapmf', [18, 25, 45, 50]),
+        'high': ('trimf', [50, 65, 80])
+    },
+    'eligibility': {
+        'low': ('trimf', [0, 0, 50]),
+        'medium': ('trimf', [25, 50, 75]),
+        'high': ('trimf', [50, 100, 100])
+    },
+    'scholarship_type': {
+        'vocational': ('trimf', [0, 0, 50]),
+        'academic': ('trimf', [25, 50, 75]),
+        'research': ('trimf', [50, 100, 100])
+    }
+}
+
+# Rules as (poverty, education, employment) -> eligibility
+ELIGIBILITY_RULES = [
+    ('low', 'below_upper', 'low', 'high'),
+    ('low', 'below_upper', 'medium', 'high'),
+    ('low', 'below_upper', 'high', 'medium'),
+    ('low', 'upper_second', 'low', 'high'),
+    ('low', 'upper_second', 'medium', 'medium'),
+    ('low', 'upper_second', 'high', 'medium'),
+    ('low', 'tertiary', 'low', 'high'),
+    ('low', 'tertiary', 'medium', 'medium'),
+    ('low', 'tertiary', 'high', 'medium'),
+    ('medium', 'below_upper', 'low', 'high'),
+    ('medium', 'below_upper', 'medium', 'high'),
+    ('low', 'below_upper', 'high', 'medium'),
+    ('medium', 'upper_second', 'low', 'high'),
+    ('medium', 'upper_second', 'medium', 'medium'),
+    ('medium', 'upper_second', 'high', 'low'),
+    ('medium', 'tertiary', 'low', 'high'),
+    ('medium', 'tertiary', 'medium', 'medium'),
+    ('medium', 'tertiary', 'high', 'low'),
+    ('low', 'below_upper', 'low', 'medium'),
+    ('low', 'below_upper', 'medium', 'medium'),
+    ('low', 'below_upper', 'high', 'low'),
+    ('low', 'upper_second', 'low', 'medium'),
+    ('low', 'upper_second', 'medium', 'medium'),
+    ('low', 'upper_second', 'high', 'low'),
+    ('low', 'tertiary', 'low', 'low'),
+    ('low', 'tertiary', 'medium', 'medium'),
+    ('low', 'tertiary', 'high', 'low'),
+]
+
+# Rules as (poverty, education, employment) -> scholarship type
+SCHOLARSHIP_RULES = [
+    ('low', 'below_upper', 'low', 'vocational'),
+    ('low', 'below_upper', 'medium', 'vocational'),
+    ('low', 'below_upper', 'high', 'vocational'),
+    ('low', 'upper_second', 'low', 'academic'),
+    ('low', 'upper_second', 'medium', 'academic'),
+    ('low', 'upper_second', 'high', 'academic'),
+    ('low', 'tertiary', 'low', 'research'),
+    ('low', 'tertiary', 'medium', 'research'),
+    ('low', 'tertiary', 'high', 'research'),
+    ('medium', 'below_upper', 'low', 'vocational'),
+    ('medium', 'below_upper', 'medium', 'vocational'),
+    ('low', 'below_upper', 'high', 'vocational'),
+    ('medium', 'upper_second', 'low', 'academic'),
+    ('medium', 'upper_second', 'medium', 'academic'),
+    ('medium', 'upper_second', 'high', 'academic'),
+    ('medium', 'tertiary', 'low', 'research'),
+    ('medium', 'tertiary', 'medium', 'research'),
+    ('medium', 'tertiary', 'high', 'research'),
+    ('low', 'below_upper', 'low', 'vocational'),
+    ('low', 'below_upper', 'medium', 'vocational'),
+    ('low', 'below_upper', 'high', 'vocational'),
+    ('low', 'upper_second', 'low', 'academic'),
+    ('low', 'upper_second', 'medium', 'academic'),
+    ('low', 'upper_second', 'high', 'academic'),
+    ('low', 'tertiary', 'low', 'research'),
+    ('low', 'tertiary', 'medium', 'research'),
+    ('low', 'tertiary', 'high', 'research'),
+]
+
+# Readable names of the scholarship type terms
+SCHOLARSHIP_TYPE_NAMES = {
+    'vocational': 'Vocational Training Grant',
+    'academic': 'Academic Scholarship',
+    'research': 'Research Grant'
+}
+
+
+def universe(variable):
+    low, high = UNIVERSES[variable]
+    return np.arange(low, high + 1, 1)
+
+
+def membership_function(variable, shape, params):
+    """Evaluate a membership function definition on the universe of a variable"""
+    if shape == 'trimf':
+        return fuzz.trimf(universe(variable), params)
+    if shape == 'trapmf':
+        return fuzz.trapmf(universe(variable), params)
+    raise ValueError(f'Unsupported membership function shape: {shape}')
+
+
+def membership_functions_version(membership_functions):
+    """Short hash identifying a set of membership functions"""
+    return hashlib.sha256(
+        json.dumps(membership_functions, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:12]
+
+
+def merge_membership_functions(overrides):
+    """
+    Replace some membership functions of the hand-picked set.
+
+    Args:
+        overrides (dict): variable -> term -> (shape, breakpoints)
+
+    Returns:
+        dict: Membership functions of every variable
+
+    Raises:
+        ValueError: If a variable, term or shape is unknown, or the number of breakpoints
+            does not match the shape
+    """
+    membership_functions = {variable: dict(terms) for variable, terms in MEMBERSHIP_FUNCTIONS.items()}
+    for variable, terms in overrides.items():
+        if variable not in membership_functions:
+            raise ValueError(f'Unknown fuzzy variable: {variable}')
+        for term, (shape, params) in terms.items():
+            if term not in membership_functions[variable]:
+                raise ValueError(f'Unknown term {term} of {variable}')
+            if shape not in ('trimf', 'trapmf'):
+                raise ValueError(f'Unsupported membership function shape: {shape}')
+            size = 3 if shape == 'trimf' else 4
+            if len(params) != size:
+                raise ValueError(f'{shape} of {variable} {term} needs {size} breakpoints')
+            membership_functions[variable][term] = (shape, [float(p) for p in params])
+    return membership_functions
+
+
+def load_membership_functions(path):
+    """Read a membership function configuration written by fis_tuning.py"""
+    with open(path) as f:
+        config = json.load(f)
+    return merge_membership_functions(config['membership_functions'])
+
+
 class FuzzyInferenceSystem:
-    def __init__(self):
+    def __init__(self, membership_functions=None):
+        self.membership_functions = membership_functions or MEMBERSHIP_FUNCTIONS
+
+        # Identifies the membership functions in use, e.g. for cached results
+        self.version = ('builtin' if membership_functions is None
+                        else membership_functions_version(self.membership_functions))
+
         # Create input variables
-        self.poverty = ctrl.Antecedent(np.arange(0, 61, 1), 'poverty')
-        self.education = ctrl.Antecedent(np.arange(0, 101, 1), 'education')
-        self.employment = ctrl.Antecedent(np.arange(0, 81, 1), 'employment')
+        self.poverty = ctrl.Antecedent(universe('poverty'), 'poverty')
+        self.education = ctrl.Antecedent(universe('education'), 'education')
+        self.employment = ctrl.Antecedent(universe('employment'), 'employment')
 
         # Create output variables
-        self.eligibility = ctrl.Consequent(np.arange(0, 101, 1), 'eligibility')
-        self.scholarship_type = ctrl.Consequent(np.arange(0, 101, 1), 'scholarship_type')
+        self.eligibility = ctrl.Consequent(universe('eligibility'), 'eligibility')
+        self.scholarship_type = ctrl.Consequent(universe('scholarship_type'), 'scholarship_type')
 
         # Setup membership functions
         self._setup_membership_functions()
@@ -28,92 +207,21 @@ class FuzzyInferenceSystem:
         self.scholarship_simulator = ctrl.ControlSystemSimulation(self.scholarship_ctrl)
     
     def _setup_membership_functions(self):
-        # Membership functions for poverty
-        self.poverty['low'] = fuzz.trimf(self.poverty.universe, [0, 5, 15])
-        self.poverty['medium'] = fuzz.trapmf(self.poverty.universe, [10, 15, 40, 50])
-        self.poverty['high'] = fuzz.trimf(self.poverty.universe, [40, 50, 60])
-
-        # Membership functions for education
-        self.education['below_upper'] = fuzz.trimf(self.education.universe, [0, 0, 33])
-        self.education['upper_second'] = fuzz.trimf(self.education.universe, [25, 50, 75])
-        self.education['tertiary'] = fuzz.trimf(self.education.universe, [67, 100, 100])
-
-        # Membership functions for employment
-        self.employment['low'] = fuzz.trimf(self.employment.universe, [0, 15, 20])
-        self.employment['medium'] = fuzz.trapmf(self.employment.universe, [18, 25, 45, 50])
-        self.employment['high'] = fuzz.trimf(self.employment.universe, [50, 65, 80])
-
-        # Membership functions for eligibility score
-        self.eligibility['low'] = fuzz.trimf(self.eligibility.universe, [0, 0, 50])
-        self.eligibility['medium'] = fuzz.trimf(self.eligibility.universe, [25, 50, 75])
-        self.eligibility['high'] = fuzz.trimf(self.eligibility.universe, [50, 100, 100])
-
-        # Membership functions for scholarship type
-        self.scholarship_type['vocational'] = fuzz.trimf(self.scholarship_type.universe, [0, 0, 50])
-        self.scholarship_type['academic'] = fuzz.trimf(self.scholarship_type.universe, [25, 50, 75])
-        self.scholarship_type['research'] = fuzz.trimf(self.scholarship_type.universe, [50, 100, 100])
+        for variable in (self.poverty, self.education, self.employment, self.eligibility, self.scholarship_type):
+            for term, (shape, params) in self.membership_functions[variable.label].items():
+                variable[term] = membership_function(variable.label, shape, params)
     
     def _setup_rules(self):
         # Rules for eligibility score
         self.eligibility_rules = [
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['medium'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['high'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['high'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['medium'] & self.education['below_upper'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['medium'] & self.education['below_upper'] & self.employment['medium'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['high'], self.eligibility['low']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['low'], self.eligibility['high']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['high'], self.eligibility['low']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['low'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.eligibility['low']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['low'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['high'], self.eligibility['low']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['low'], self.eligibility['low']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['medium'], self.eligibility['medium']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['high'], self.eligibility['low']),
+            ctrl.Rule(self.poverty[p] & self.education[ed] & self.employment[em], self.eligibility[out])
+            for p, ed, em, out in ELIGIBILITY_RULES
         ]
 
         # Rules for scholarship type
         self.scholarship_rules = [
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['low'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['medium'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['low'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['medium'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['high'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['low'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['medium'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['high'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['medium'] & self.education['below_upper'] & self.employment['low'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['medium'] & self.education['below_upper'] & self.employment['medium'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['low'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['medium'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['medium'] & self.education['upper_second'] & self.employment['high'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['low'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['medium'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['medium'] & self.education['tertiary'] & self.employment['high'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['low'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['medium'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['below_upper'] & self.employment['high'], self.scholarship_type['vocational']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['low'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['medium'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['upper_second'] & self.employment['high'], self.scholarship_type['academic']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['low'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['medium'], self.scholarship_type['research']),
-            ctrl.Rule(self.poverty['low'] & self.education['tertiary'] & self.employment['high'], self.scholarship_type['research']),
+            ctrl.Rule(self.poverty[p] & self.education[ed] & self.employment[em], self.scholarship_type[out])
+            for p, ed, em, out in SCHOLARSHIP_RULES
         ]
     
     def predict(self, poverty_val, education_val, employment_val):
@@ -172,11 +280,7 @@ class FuzzyInferenceSystem:
         )
 
         # Map scholarship type to readable format
-        scholarship_type_readable = {
-            'vocational': 'Vocational Training Grant',
-            'academic': 'Academic Scholarship',
-            'research': 'Research Grant'
-        }
+        scholarship_type_readable = SCHOLARSHIP_TYPE_NAMES
 
         print("scholarship_memberships",scholarship_memberships)
 
@@ -226,7 +330,7 @@ class FuzzyInferenceSystem:
         }
 
 # Create singleton instance
-fis_predictor = FuzzyInferenceSystem() 
+fis_predictor = FuzzyInferenceSystem(load_membership_functions(FIS_MF_CONFIG) if FIS_MF_CONFIG else None)
 
 if __name__ == "__main__":
     result = fis_predictor.evaluate_country({
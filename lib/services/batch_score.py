@@ -0,0 +1,267 @@
+"""
+Offline bulk scoring of region-year rows with the FIS and/or ANN models.
+
+The input (CSV or Parquet) is streamed in chunks. Each chunk is scored in a worker
+process and written as its own part file in the output directory, so memory stays
+bounded by the number of chunks in flight. Part files are written atomically and
+double as checkpoints: rerunning with --resume skips chunks that are already done.
+The settings a run was started with are recorded in a manifest, and a resume with
+different settings is refused, since it would mix incompatible part files.
+
+Input columns are the same as the country parameters of the API (povertyRate,
+educationLevel, employmentRate, each 0-1). All other columns are passed through.
+
+Usage:
+    python batch_score.py regions.parquet scores/ --models fis,ann --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+INPUT_COLUMNS = ('povertyRate', 'educationLevel', 'employmentRate')
+MODELS = ('fis', 'ann')
+
+MANIFEST_FILENAME = 'manifest.json'
+
+# Per-process model instances, created by _init_worker
+_fis_engine = None
+_ann_predictor = None
+
+
+def _init_worker(models):
+    global _fis_engine, _ann_predictor
+
+    if 'fis' in models:
+        try:
+            from .FIS import fis_predictor
+            from .fis_engine import VectorizedFIS
+        except ImportError:
+            from FIS import fis_predictor
+            from fis_engine import VectorizedFIS
+        # Same membership functions as the server, including a tuned FIS_MF_CONFIG
+        _fis_engine = VectorizedFIS(fis_predictor.membership_functions)
+
+    if 'ann' in models:
+        try:
+            from .ANN import ann_predictor
+        except ImportError:
+            from ANN import ann_predictor
+        _ann_predictor = ann_predictor
+
+
+def score_frame(frame, models):
+    """
+    Score a chunk of rows.
+
+    Args:
+        frame (DataFrame): Rows with povertyRate, educationLevel and employmentRate (0-1)
+        models (tuple): Any of 'fis', 'ann'
+
+    Returns:
+        DataFrame: Input rows with <model>_score (0-1) and <model>_recommendedType columns
+    """
+    poverty_rate, education_level, employment_rate = (
+        frame[column].to_numpy(dtype=float) for column in INPUT_COLUMNS
+    )
+    scored = frame.copy()
+
+    if 'fis' in models:
+        # Scale parameters to the range expected by the FIS
+        prediction = _fis_engine.predict(poverty_rate * 60, education_level * 100, employment_rate * 80)
+        scored['fis_score'] = prediction['eligibility_score']
+        scored['fis_recommendedType'] = prediction['scholarship_type']
+
+    if 'ann' in models:
+        # Scale parameters from 0-1 range to 1-3 range for the model
+        inputs = 1 + np.column_stack([poverty_rate, education_level, employment_rate]) * 2
+        eligibility, scholarship = _ann_predictor.predict_batch(inputs)
+        scored['ann_score'] = (eligibility - 1) / 2
+        scored['ann_recommendedType'] = _ann_predictor.get_scholarship_types(scholarship)
+
+    return scored
+
+
+def model_versions(models):
+    """
+    Versions the workers will score with: the FIS membership functions and the
+    active ANN version of the registry, read without loading the ANN model.
+    """
+    versions = {}
+    if 'fis' in models:
+        try:
+            from .FIS import fis_predictor
+        except ImportError:
+            from FIS import fis_predictor
+        versions['fis'] = fis_predictor.version
+    if 'ann' in models:
+        try:
+            from .model_registry import ModelRegistry
+        except ImportError:
+            from model_registry import ModelRegistry
+        versions['ann'] = ModelRegistry().get_active()
+    return versions
+
+
+def part_path(output_dir, index, output_format):
+    return os.path.join(output_dir, f'part-{index:06d}.{output_format}')
+
+
+def _score_chunk(index, frame, models, output_dir, output_format):
+    """Worker task: score one chunk and write its part file"""
+    started = time.perf_counter()
+    scored = score_frame(frame, models)
+
+    path = part_path(output_dir, index, output_format)
+    tmp_path = path + '.tmp'
+    if output_format == 'parquet':
+        scored.to_parquet(tmp_path, index=False)
+    else:
+        scored.to_csv(tmp_path, index=False)
+    # Rename last so an interrupted chunk is never mistaken for a finished one
+    os.replace(tmp_path, path)
+
+    return index, len(scored), time.perf_counter() - started
+
+
+def check_manifest(output_dir, settings, resume):
+    """
+    Record the settings of a run, or on resume check them against the recorded ones.
+
+    Raises:
+        ValueError: If the output directory holds parts of a run with other settings,
+            or holds parts without --resume
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    has_parts = any(name.startswith('part-') for name in os.listdir(output_dir))
+
+    if has_parts and not resume:
+        raise ValueError(f'{output_dir} already contains part files; use --resume to continue')
+
+    if has_parts:
+        try:
+            with open(path) as f:
+                recorded = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f'{output_dir} has part files but no {MANIFEST_FILENAME}; cannot check the settings')
+
+        changed = [key for key in settings if recorded.get(key) != settings[key]]
+        if changed:
+            details = ', '.join(f'{key} {recorded.get(key)!r} -> {settings[key]!r}' for key in changed)
+            raise ValueError(f'Cannot resume with different settings: {details}')
+        return
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_chunks(input_path, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    if input_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunk_size)
+
+
+def run(input_path, output_dir, models=MODELS, chunk_size=100_000, workers=None,
+        output_format=None, resume=False):
+    """
+    Score a whole file.
+
+    Returns:
+        dict: Rows scored, chunks skipped and rows per second
+    """
+    workers = workers or os.cpu_count() or 1
+    output_format = output_format or ('parquet' if input_path.endswith('.parquet') else 'csv')
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Chunk boundaries, columns, scores and file names of the parts depend on these
+    check_manifest(output_dir, {
+        'input': os.path.abspath(input_path),
+        'chunkSize': chunk_size,
+        'models': list(models),
+        'modelVersions': model_versions(models),
+        'outputFormat': output_format
+    }, resume)
+
+    rows_done = 0
+    skipped = 0
+    started = time.perf_counter()
+    pending = set()
+
+    def collect(done):
+        nonlocal rows_done
+        for future in done:
+            index, rows, elapsed = future.result()
+            rows_done += rows
+            throughput = rows_done / (time.perf_counter() - started)
+            print(f'chunk {index}: {rows} rows in {elapsed:.2f}s, total {rows_done} rows, {throughput:,.0f} rows/s')
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(models,)) as executor:
+        for index, frame in enumerate(read_chunks(input_path, chunk_size)):
+            if resume and os.path.exists(part_path(output_dir, index, output_format)):
+                skipped += 1
+                continue
+
+            missing = [column for column in INPUT_COLUMNS if column not in frame.columns]
+            if missing:
+                raise ValueError(f'Missing input columns: {", ".join(missing)}')
+
+            # Bound the number of chunks held in memory
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            pending.add(executor.submit(_score_chunk, index, frame, models, output_dir, output_format))
+
+        done, _ = wait(pending)
+        collect(done)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows_done,
+        'skippedChunks': skipped,
+        'seconds': elapsed,
+        'rowsPerSecond': rows_done / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV/Parquet file with the FIS and/or ANN models')
+    parser.add_argument('input', help='Input .csv or .parquet file')
+    parser.add_argument('output_dir', help='Directory for the scored part files')
+    parser.add_argument('--models', default='fis,ann', help='Comma-separated models to run (fis, ann)')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output-format', choices=('csv', 'parquet'), help='Default: same as input')
+    parser.add_argument('--resume', action='store_true', help='Skip chunks that already have a part file')
+    args = parser.parse_args(argv)
+
+    models = tuple(model.strip().lower() for model in args.models.split(',') if model.strip())
+    unknown = [model for model in models if model not in MODELS]
+    if unknown or not models:
+        parser.error(f'Invalid models: {args.models}. Must be any of: {", ".join(MODELS)}')
+
+    try:
+        summary = run(args.input, args.output_dir, models, args.chunk_size, args.workers,
+                      args.output_format, args.resume)
+    except ValueError as e:
+        print(f'Error: {str(e)}', file=sys.stderr)
+        return 1
+
+    print(f"Scored {summary['rows']} rows in {summary['seconds']:.1f}s "
+          f"({summary['rowsPerSecond']:,.0f} rows/s), skipped {summary['skippedChunks']} finished chunks")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_COUNTRY_REGISTRY_PATH = os.environ.get(
+    'COUNTRY_REGISTRY_PATH',
+    os.path.join(os.path.dirname(__file__), 'countries.json')
+)
+# Evaluated countries kept in memory, across models and versions
+COUNTRY_CACHE_SIZE = int(os.environ.get('COUNTRY_CACHE_SIZE', 10000))
+
+INPUT_KEYS = ('povertyRate', 'educationLevel', 'employmentRate')
+
+# Scaling of the 0-1 rates to the inputs of each model, as in evaluate_country: offset + rate * scale
+INPUT_SCALING = {
+    'FIS': (np.array([0.0, 0.0, 0.0]), np.array([60.0, 100.0, 80.0])),  # 0-1 → 0-60, 0-100, 0-80
+    'ANN': (np.array([1.0, 1.0, 1.0]), np.array([2.0, 2.0, 2.0]))  # 0-1 → 1-3
+}
+
+
+class UndefinedScoreError(ValueError):
+    """No rule of the model fires for the parameters of some countries"""
+
+
+class CountryData:
+    """One loaded version of the country parameters, with the inputs of every model pre-scaled"""
+
+    def __init__(self, version, countries, fingerprint):
+        self.version = version
+        self.countries = countries
+        self.fingerprint = fingerprint
+
+        self.ids = [country['id'] for country in countries]
+        self.index = {country_id: row for row, country_id in enumerate(self.ids)}
+        self.rates = np.array([[country[key] for key in INPUT_KEYS] for country in countries],
+                              dtype=float).reshape(-1, len(INPUT_KEYS))
+        self.inputs = {model: offset + self.rates * scale for model, (offset, scale) in INPUT_SCALING.items()}
+        # Same strings as the details of evaluate_country
+        self.details = [{key: str(country[key]) for key in INPUT_KEYS} for country in countries]
+
+
+def load_country_data(path):
+    """
+    Read and validate a country file.
+
+    The file holds {"version": "...", "countries": [{"id", "name", "povertyRate",
+    "educationLevel", "employmentRate"}, ...]} with rates between 0 and 1. Without a
+    version, a hash of the content is used.
+
+    Returns:
+        CountryData: The parsed countries
+
+    Raises:
+        ValueError: If the file is malformed
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    try:
+        document = json.loads(content)
+    except ValueError as e:
+        raise ValueError(f'Invalid country file {path}: {str(e)}')
+
+    countries = document.get('countries') if isinstance(document, dict) else None
+    if not isinstance(countries, list):
+        raise ValueError(f'Country file {path} has no "countries" list')
+
+    seen = set()
+    for position, country in enumerate(countries):
+        country_id = country.get('id') if isinstance(country, dict) else None
+        if not isinstance(country_id, str) or not country_id:
+            raise ValueError(f'Country {position} has no id')
+        if country_id in seen:
+            raise ValueError(f'Duplicate country id: {country_id}')
+        seen.add(country_id)
+        for key in INPUT_KEYS:
+            value = country.get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+                raise ValueError(f'Country {country_id}: {key} must be a number between 0 and 1')
+
+    fingerprint = hashlib.sha256(content).hexdigest()
+    return CountryData(str(document.get('version') or fingerprint[:12]), countries, fingerprint)
+
+
+class CountryRegistry:
+    """
+    Server-side country parameters, so requests can reference countries by id.
+
+    Evaluations are vectorized over all requested countries that are not cached yet,
+    and cached per (model, model version, country id, content of the country file).
+    """
+
+    def __init__(self, path=DEFAULT_COUNTRY_REGISTRY_PATH, cache_size=COUNTRY_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+
+        self._data = CountryData('empty', [], None)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self.reload()
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def version(self):
+        return self._data.version
+
+    def reload(self):
+        """
+        Load the country file again. On errors the current data stays in use.
+
+        Returns:
+            CountryData: The data now in use
+        """
+        data = load_country_data(self.path)
+        with self._lock:
+            # Entries of the old content can no longer be hit, free them
+            if data.fingerprint != self._data.fingerprint:
+                self._cache.clear()
+            self._data = data
+        return data
+
+    def evaluate(self, model_type, country_ids, model_version, evaluate_batch):
+        """
+        Evaluate countries by id.
+
+        Args:
+            model_type (str): 'FIS' or 'ANN'
+            country_ids (list): Ids of countries in the registry
+            model_version (str): Version of the model, part of the cache key
+            evaluate_batch (callable): evaluate_batch(inputs) with the (n, 3) pre-scaled inputs
+                of the model, returning (scores 0-1, scholarship type names, (n, types)
+                memberships, recommended types)
+
+        Returns:
+            tuple: (results in the shape of evaluate_country plus countryId, in request
+                order, version of the country data used)
+
+        Raises:
+            KeyError: If a country id is unknown
+            UndefinedScoreError: If the model has no score for some countries
+        """
+        # Use one version of the data for the whole request, even if it is reloaded meanwhile
+        data = self._data
+
+        unknown = [country_id for country_id in country_ids if country_id not in data.index]
+        if unknown:
+            raise KeyError(', '.join(str(country_id) for country_id in unknown))
+
+        # Keyed by the content, not the version string: edited content under an unchanged
+        # version, or results of a request still running on the old data, never mix
+        keys = [(model_type, model_version, country_id, data.fingerprint) for country_id in country_ids]
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+
+        missing = list(OrderedDict.fromkeys(key for key in keys if key not in results))
+        if missing:
+            rows = np.array([data.index[key[2]] for key in missing])
+            scores, type_names, memberships, recommended = evaluate_batch(data.inputs[model_type][rows])
+
+            undefined = [missing[i][2] for i in np.flatnonzero(np.isnan(scores))]
+            if undefined:
+                raise UndefinedScoreError(f'No {model_type} rule fires for countries: {", ".join(undefined)}')
+
+            for key, row, score, weights, recommended_type in zip(missing, rows, scores, memberships, recommended):
+                country = data.countries[row]
+                results[key] = {
+                    'country': country.get('name', 'Unknown'),
+                    'countryId': country['id'],
+                    'score': float(score),
+                    'scholarshipTypes': dict(zip(type_names, (float(weight) for weight in weights))),
+                    'recommendedType': recommended_type,
+                    'details': data.details[row]
+                }
+
+            with self._lock:
+                for key in missing:
+                    self._cache[key] = results[key]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [results[key] for key in keys], data.version
+
+    def describe(self):
+        """Version and parameters of every country"""
+        data = self._data
+        return {'version': data.version, 'countries': data.countries}
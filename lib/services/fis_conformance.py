@@ -0,0 +1,250 @@
+"""
+Golden-output conformance check and microbenchmark for FIS engines.
+
+Every engine is run on the integer input grid and on random float inputs and
+compared with the reference skfuzzy path (FuzzyInferenceSystem.predict). The report
+lists the max and mean absolute deviation of the eligibility and scholarship
+scores (0-1), recommendation mismatches and disagreements on inputs where no rule
+fires, followed by the per-sample and batched cost of each engine.
+
+Usage:
+    python fis_conformance.py --grid-step 1 --random 10000
+    python fis_conformance.py --include-api ../../scripts/FIS.py
+"""
+import abc
+import argparse
+import contextlib
+import importlib.util
+import io
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .FIS import fis_predictor, universe, SCHOLARSHIP_TYPE_NAMES
+    from .fis_engine import VectorizedFIS
+except ImportError:
+    # Direct import for development
+    from FIS import fis_predictor, universe, SCHOLARSHIP_TYPE_NAMES
+    from fis_engine import VectorizedFIS
+
+
+class Engine(abc.ABC):
+    """
+    An FIS implementation under test.
+
+    predict_batch takes arrays in the FIS ranges (0-60, 0-100, 0-80) and returns
+    (eligibility 0-1, scholarship 0-1, recommended type name) arrays, with NaN and
+    None where the engine has no output.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def predict_batch(self, poverty, education, employment):
+        pass
+
+    def predict_one(self, poverty, education, employment):
+        return self.predict_batch(np.array([poverty]), np.array([education]), np.array([employment]))
+
+
+class PerSampleEngine(Engine):
+    """Engine around a function that evaluates one input at a time"""
+
+    @abc.abstractmethod
+    def _predict(self, poverty, education, employment):
+        """Returns (eligibility 0-1, scholarship 0-1, recommended type name) of one input"""
+
+    def predict_batch(self, poverty, education, employment):
+        eligibility = np.full(len(poverty), np.nan)
+        scholarship = np.full(len(poverty), np.nan)
+        recommended = np.full(len(poverty), None, dtype=object)
+        for i, inputs in enumerate(zip(poverty, education, employment)):
+            try:
+                eligibility[i], scholarship[i], recommended[i] = self._predict(*(float(v) for v in inputs))
+            except (ValueError, KeyError):
+                # No rule fired: skfuzzy either fails to defuzzify or leaves the output unset
+                pass
+        return eligibility, scholarship, recommended
+
+    def predict_one(self, poverty, education, employment):
+        try:
+            return self._predict(poverty, education, employment)
+        except (ValueError, KeyError):
+            return np.nan, np.nan, None
+
+
+class ReferenceEngine(PerSampleEngine):
+    name = 'skfuzzy (FuzzyInferenceSystem.predict)'
+
+    def _predict(self, poverty, education, employment):
+        # predict prints its inputs and outputs
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fis_predictor.predict(poverty, education, employment)
+        return result['eligibility_score'], result['scholarship_score'], result['scholarship_type']
+
+
+class ApiEngine(PerSampleEngine):
+    """evaluate_scholarship from the Cloud Run FIS API (scripts/FIS.py)"""
+
+    name = 'skfuzzy (scripts/FIS.py evaluate_scholarship)'
+
+    def __init__(self, path):
+        path = os.path.abspath(path)
+        sys.path.insert(0, os.path.dirname(path))
+        spec = importlib.util.spec_from_file_location('fis_api', path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        # Inputs where no rule fires are expected here; don't log each of them
+        self.module.logger.setLevel(logging.CRITICAL)
+
+    def _predict(self, poverty, education, employment):
+        result = self.module.evaluate_scholarship(poverty, education, employment)
+        return (result['eligibility_score'] / 100.0,
+                None,
+                SCHOLARSHIP_TYPE_NAMES.get(result['scholarship_type'], 'Unknown'))
+
+    def predict_batch(self, poverty, education, employment):
+        eligibility, _, recommended = super().predict_batch(poverty, education, employment)
+        # evaluate_scholarship does not return the raw scholarship score
+        return eligibility, np.full(len(poverty), np.nan), recommended
+
+
+class VectorizedEngine(Engine):
+    name = 'numpy (VectorizedFIS)'
+
+    def __init__(self):
+        self.fis = VectorizedFIS(fis_predictor.membership_functions)
+
+    def predict_batch(self, poverty, education, employment):
+        result = self.fis.predict(poverty, education, employment)
+        return result['eligibility_score'], result['scholarship_score'], result['scholarship_type']
+
+
+def integer_grid(step=1):
+    """All integer inputs (every step-th value) of the three input universes"""
+    axes = [universe(variable)[::step] for variable in ('poverty', 'education', 'employment')]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return tuple(m.ravel().astype(float) for m in mesh)
+
+
+def random_inputs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return tuple(
+        rng.uniform(universe(variable)[0], universe(variable)[-1], count)
+        for variable in ('poverty', 'education', 'employment')
+    )
+
+
+def compare(reference, candidate):
+    """
+    Compare two (eligibility, scholarship, recommended) results.
+
+    Returns:
+        dict: Deviation statistics over the inputs where both engines have an output
+    """
+    ref_eligibility, ref_scholarship, ref_type = reference
+    eligibility, scholarship, recommended = candidate
+
+    ref_defined = ~np.isnan(ref_eligibility)
+    defined = ~np.isnan(eligibility)
+    both = ref_defined & defined
+
+    stats = {
+        'compared': int(both.sum()),
+        'undefined_mismatches': int((ref_defined != defined).sum()),
+        'recommendation_mismatches': int((ref_type[both] != recommended[both]).sum())
+    }
+    for label, ref_values, values in (('eligibility', ref_eligibility, eligibility),
+                                      ('scholarship', ref_scholarship, scholarship)):
+        deviation = np.abs(ref_values[both] - values[both])
+        deviation = deviation[~np.isnan(deviation)]
+        stats[f'{label}_max'] = float(deviation.max()) if deviation.size else None
+        stats[f'{label}_mean'] = float(deviation.mean()) if deviation.size else None
+    return stats
+
+
+def time_engine(engine, inputs, per_sample_count):
+    """
+    Returns:
+        tuple: (seconds per sample called one at a time, seconds per sample in one batch)
+    """
+    poverty, education, employment = (values[:per_sample_count] for values in inputs)
+    started = time.perf_counter()
+    for p, ed, em in zip(poverty, education, employment):
+        engine.predict_one(float(p), float(ed), float(em))
+    per_sample = (time.perf_counter() - started) / len(poverty)
+
+    started = time.perf_counter()
+    engine.predict_batch(*inputs)
+    batched = (time.perf_counter() - started) / len(inputs[0])
+    return per_sample, batched
+
+
+def _format(value, spec='.2e'):
+    return 'n/a' if value is None else format(value, spec)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check FIS engines against the skfuzzy reference')
+    parser.add_argument('--grid-step', type=int, default=5,
+                        help='Stride of the integer input grid (1 = full grid, ~500k inputs)')
+    parser.add_argument('--random', type=int, default=1000, help='Random float inputs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--include-api', metavar='PATH', help='Also check evaluate_scholarship in scripts/FIS.py')
+    parser.add_argument('--timing-samples', type=int, default=200,
+                        help='Inputs timed one call at a time (batched timing uses --random inputs)')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help='Maximum allowed absolute deviation before exiting with status 1')
+    args = parser.parse_args(argv)
+
+    reference = ReferenceEngine()
+    candidates = [VectorizedEngine()]
+    if args.include_api:
+        candidates.append(ApiEngine(args.include_api))
+
+    sweeps = {
+        f'integer grid (step {args.grid_step})': integer_grid(args.grid_step),
+        f'random floats (seed {args.seed})': random_inputs(args.random, args.seed)
+    }
+
+    failed = False
+    print('Conformance against ' + reference.name)
+    for sweep_name, inputs in sweeps.items():
+        print(f'\n{sweep_name}: {len(inputs[0])} inputs')
+        expected = reference.predict_batch(*inputs)
+        print(f"  reference undefined (no rule fires): {int(np.isnan(expected[0]).sum())}")
+        print(f"  {'engine':<48}{'compared':>9}{'elig max':>10}{'elig mean':>10}"
+              f"{'schol max':>10}{'schol mean':>11}{'type diff':>10}{'undef diff':>11}")
+
+        for engine in candidates:
+            stats = compare(expected, engine.predict_batch(*inputs))
+            print(f"  {engine.name:<48}{stats['compared']:>9}"
+                  f"{_format(stats['eligibility_max']):>10}{_format(stats['eligibility_mean']):>10}"
+                  f"{_format(stats['scholarship_max']):>10}{_format(stats['scholarship_mean']):>11}"
+                  f"{stats['recommendation_mismatches']:>10}{stats['undefined_mismatches']:>11}")
+
+            deviations = [stats[key] for key in ('eligibility_max', 'scholarship_max') if stats[key] is not None]
+            if (stats['recommendation_mismatches'] or stats['undefined_mismatches']
+                    or any(d > args.tolerance for d in deviations)):
+                failed = True
+
+    # Fresh inputs: skfuzzy caches results per input, so the sweep inputs would be cache hits
+    timing_inputs = random_inputs(args.random, args.seed + 1)
+    print(f"\nCost ({min(args.timing_samples, len(timing_inputs[0]))} single calls, "
+          f"batch of {len(timing_inputs[0])})")
+    print(f"  {'engine':<48}{'per sample':>14}{'batched':>14}{'batched/s':>14}")
+    for engine in [reference] + candidates:
+        per_sample, batched = time_engine(engine, timing_inputs, args.timing_samples)
+        print(f"  {engine.name:<48}{per_sample * 1e6:>11.1f} us{batched * 1e6:>11.2f} us"
+              f"{1 / batched if batched else float('inf'):>14,.0f}")
+
+    print('\nFAILED: deviations above tolerance' if failed else '\nOK: all engines conform')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
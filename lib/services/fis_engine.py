@@ -0,0 +1,189 @@
+import numpy as np
+
+try:
+    from .FIS import (
+        MEMBERSHIP_FUNCTIONS, ELIGIBILITY_RULES, SCHOLARSHIP_RULES,
+        SCHOLARSHIP_TYPE_NAMES, universe, membership_function
+    )
+except ImportError:
+    # Direct import for development
+    from FIS import (
+        MEMBERSHIP_FUNCTIONS, ELIGIBILITY_RULES, SCHOLARSHIP_RULES,
+        SCHOLARSHIP_TYPE_NAMES, universe, membership_function
+    )
+
+INPUT_VARIABLES = ('poverty', 'education', 'employment')
+
+
+class VectorizedFIS:
+    """
+    NumPy implementation of the FuzzyInferenceSystem that evaluates many inputs at once.
+
+    It follows the skfuzzy Mamdani computation step by step (min for AND, max
+    accumulation, output universe upsampled at the cut points, piecewise-linear
+    centroid), so results match FuzzyInferenceSystem.predict up to floating
+    point rounding. Where skfuzzy raises because no rule fires, the outputs are NaN.
+    """
+
+    def __init__(self, membership_functions=None):
+        self.membership_functions = membership_functions or MEMBERSHIP_FUNCTIONS
+
+        self.universes = {}
+        self.terms = {}
+        self.term_mfs = {}
+        for variable, terms in self.membership_functions.items():
+            self.universes[variable] = universe(variable).astype(float)
+            self.terms[variable] = list(terms)
+            self.term_mfs[variable] = np.array([
+                membership_function(variable, shape, params)
+                for shape, params in terms.values()
+            ], dtype=float)
+
+        self.eligibility_rules = self._index_rules(ELIGIBILITY_RULES, 'eligibility')
+        self.scholarship_rules = self._index_rules(SCHOLARSHIP_RULES, 'scholarship_type')
+
+    def _index_rules(self, rules, output):
+        """Convert rule tables to term index arrays: (antecedent indices, consequent index)"""
+        antecedents = np.array([
+            [self.terms[variable].index(term) for variable, term in zip(INPUT_VARIABLES, rule[:3])]
+            for rule in rules
+        ])
+        consequents = np.array([self.terms[output].index(rule[3]) for rule in rules])
+        return antecedents, consequents
+
+    def _fuzzify(self, variable, values):
+        """Membership of each input in each term, shape (n, terms)"""
+        grid = self.universes[variable]
+        values = np.clip(values, grid[0], grid[-1])
+        return np.stack([np.interp(values, grid, mf) for mf in self.term_mfs[variable]], axis=1)
+
+    def _cuts(self, memberships, rules, output):
+        """Rule firing strengths accumulated per output term, shape (n, terms)"""
+        antecedents, consequents = rules
+        firing = memberships[0][:, antecedents[:, 0]]
+        for i in (1, 2):
+            firing = np.fmin(firing, memberships[i][:, antecedents[:, i]])
+
+        cuts = np.zeros((firing.shape[0], len(self.terms[output])))
+        for term in range(cuts.shape[1]):
+            fired = firing[:, consequents == term]
+            if fired.shape[1]:
+                cuts[:, term] = fired.max(axis=1)
+        return cuts
+
+    def _defuzz(self, output, cuts):
+        """Centroid of the clipped and aggregated output membership functions"""
+        grid = self.universes[output]
+        mfs = self.term_mfs[output]
+        n = cuts.shape[0]
+
+        # Points where each clipped term crosses its cut, as added by skfuzzy
+        crossings = []
+        for term, mf in enumerate(mfs):
+            cut = cuts[:, term:term + 1]
+            above = np.where(cut == 0, mf > cut, mf >= cut)
+            flips = above[:, 1:] != above[:, :-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                xx = grid[:-1] + (cut - mf[:-1]) * np.diff(grid) / np.diff(mf)
+            crossings.append(np.where(flips, xx, np.nan))
+
+        # Keep only as many columns as the sample with most crossings needs;
+        # unused slots repeat a universe point and add zero-width segments
+        crossings = np.sort(np.concatenate(crossings, axis=1), axis=1)
+        width = int((~np.isnan(crossings)).sum(axis=1).max()) if n else 0
+        crossings = np.nan_to_num(crossings[:, :width], nan=grid[0])
+        points = np.sort(np.concatenate([np.broadcast_to(grid, (n, grid.size)), crossings], axis=1), axis=1)
+
+        aggregated = np.zeros_like(points)
+        for term, mf in enumerate(mfs):
+            np.maximum(aggregated, np.minimum(cuts[:, term:term + 1], np.interp(points, grid, mf)), out=aggregated)
+
+        # Exact centroid of the piecewise-linear aggregated function
+        x1, x2 = points[:, :-1], points[:, 1:]
+        y1, y2 = aggregated[:, :-1], aggregated[:, 1:]
+        dx = x2 - x1
+        area = 0.5 * dx * (y1 + y2)
+        moment = dx * dx * (y2 + 0.5 * y1) / 3.0 + x1 * area
+        total_area = area.sum(axis=1)
+
+        result = moment.sum(axis=1) / np.fmax(total_area, np.finfo(float).eps)
+        result[aggregated.sum(axis=1) == 0] = np.nan
+        return result
+
+    def compute(self, poverty_val, education_val, employment_val):
+        """
+        Evaluate arrays of inputs in the FIS ranges (0-60, 0-100, 0-80).
+
+        Returns:
+            tuple: (eligibility, scholarship) arrays on the 0-100 scale
+        """
+        inputs = [np.atleast_1d(np.asarray(v, dtype=float)) for v in (poverty_val, education_val, employment_val)]
+        inputs = np.broadcast_arrays(*inputs)
+        memberships = [self._fuzzify(variable, values) for variable, values in zip(INPUT_VARIABLES, inputs)]
+
+        eligibility = self._defuzz('eligibility', self._cuts(memberships, self.eligibility_rules, 'eligibility'))
+        scholarship = self._defuzz('scholarship_type', self._cuts(memberships, self.scholarship_rules, 'scholarship_type'))
+        return eligibility, scholarship
+
+    def scholarship_memberships(self, scholarship):
+        """Membership of scholarship scores (0-100) in each scholarship type, shape (n, 3)"""
+        grid = self.universes['scholarship_type']
+        return np.stack([np.interp(scholarship, grid, mf) for mf in self.term_mfs['scholarship_type']], axis=1)
+
+    def predict(self, poverty_val, education_val, employment_val):
+        """
+        Vectorized counterpart of FuzzyInferenceSystem.predict.
+
+        Returns:
+            dict: Arrays 'eligibility_score' and 'scholarship_score' (0-1),
+                'scholarship_type' (readable names, None where undefined) and
+                'scholarship_memberships' of shape (n, 3), ordered as scholarship_type_names
+        """
+        eligibility, scholarship = self.compute(poverty_val, education_val, employment_val)
+        memberships = self.scholarship_memberships(scholarship)
+
+        names = np.array(self.scholarship_type_names, dtype=object)
+        recommended = names[np.argmax(memberships, axis=1)]
+        recommended[np.isnan(scholarship)] = None
+
+        return {
+            'eligibility_score': eligibility / 100.0,
+            'scholarship_score': scholarship / 100.0,
+            'scholarship_type': recommended,
+            'scholarship_memberships': memberships
+        }
+
+    @property
+    def scholarship_type_names(self):
+        return [SCHOLARSHIP_TYPE_NAMES.get(term, 'Unknown') for term in self.terms['scholarship_type']]
+
+    def evaluate_country(self, country_data):
+        """
+        Single-input counterpart of FuzzyInferenceSystem.evaluate_country.
+
+        Raises:
+            ValueError: If no rule fires for the inputs
+        """
+        poverty_rate = country_data.get('povertyRate', 0)
+        education_level = country_data.get('educationLevel', 0)
+        employment_rate = country_data.get('employmentRate', 0)
+
+        # Scale parameters to the range expected by the FIS
+        prediction = self.predict(np.array([poverty_rate * 60]),
+                                  np.array([education_level * 100]),
+                                  np.array([employment_rate * 80]))
+        if np.isnan(prediction['eligibility_score'][0]) or np.isnan(prediction['scholarship_score'][0]):
+            raise ValueError('No rule fires for these inputs')
+
+        return {
+            'country': country_data.get('name', 'Unknown'),
+            'score': float(prediction['eligibility_score'][0]),
+            'scholarshipTypes': dict(zip(self.scholarship_type_names,
+                                         prediction['scholarship_memberships'][0].tolist())),
+            'recommendedType': prediction['scholarship_type'][0],
+            'details': {
+                'povertyRate': str(poverty_rate),
+                'educationLevel': str(education_level),
+                'employmentRate': str(employment_rate)
+            }
+        }
@@ -0,0 +1,364 @@
+"""
+Tune the input membership functions of the FIS against the labelled rules.
+
+The breakpoints of the poverty, education and employment membership functions are
+searched with differential evolution so that the FIS reproduces the eligibility and
+scholarship levels of scripts/ANN/rules.xlsx. Levels 1-3 are mapped to 0-1 the same
+way the app scales inputs for the ANN, so both models agree on what a level means.
+Candidate parameter sets are scored by the vectorized FIS, one candidate per call
+over all rows, and each generation is spread over a process pool. Inputs where no
+rule fires are penalized.
+
+Candidates whose terms no longer mean what their names say are rejected: the peak of
+every membership function has to lie inside the universe, and the peaks of the terms
+of a variable have to keep their order (low, medium, high). With about as many
+breakpoints as labelled rows, the training loss says little about new inputs, so the
+search is also repeated in k folds and the loss on the held-out rows is reported.
+
+The best configuration is written as JSON that both FIS implementations load
+through the FIS_MF_CONFIG environment variable.
+
+Usage:
+    python fis_tuning.py tuned_membership_functions.json --workers 8
+    FIS_MF_CONFIG=tuned_membership_functions.json python web_server.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import differential_evolution
+
+try:
+    from .FIS import (
+        MEMBERSHIP_FUNCTIONS, UNIVERSES, SCHOLARSHIP_TYPE_NAMES,
+        merge_membership_functions, membership_functions_version
+    )
+    from .fis_engine import VectorizedFIS
+except ImportError:
+    # Direct import for development
+    from FIS import (
+        MEMBERSHIP_FUNCTIONS, UNIVERSES, SCHOLARSHIP_TYPE_NAMES,
+        merge_membership_functions, membership_functions_version
+    )
+    from fis_engine import VectorizedFIS
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'ANN', 'rules.xlsx')
+
+TUNED_VARIABLES = ('poverty', 'education', 'employment')
+
+# Squared error charged for a row where no rule fires, worse than any defined output (at most 2)
+UNDEFINED_PENALTY = 4.0
+# Loss of a candidate that breaks the peak constraints, worse than any valid candidate;
+# the size of the violation is added so the search is led back to valid candidates
+CONSTRAINT_PENALTY = 10.0
+
+# Scholarship level of rules.xlsx -> scholarship type term
+SCHOLARSHIP_LEVEL_TERMS = {1: 'vocational', 2: 'academic', 3: 'research'}
+
+# Dataset and layout of the worker process, set by _init_worker
+_inputs = None
+_targets = None
+_layout = None
+
+
+def load_dataset(path=DEFAULT_DATASET):
+    """
+    Read the labelled rules.
+
+    Returns:
+        tuple: (inputs (n, 3) in the FIS ranges, targets (n, 2) eligibility and
+            scholarship scores 0-1, scholarship levels 1-3)
+    """
+    df = pd.read_excel(path, sheet_name='Sheet1')
+    rows = df.iloc[3:, [1, 2, 3, 4, 5]].dropna().astype(float).to_numpy()
+
+    # Levels 1-3 → 0-1, then to the range expected by the FIS
+    rates = (rows - 1) / 2
+    inputs = rates[:, :3] * [UNIVERSES[variable][1] for variable in TUNED_VARIABLES]
+    return inputs, rates[:, 3:], rows[:, 4].astype(int)
+
+
+def parameter_layout(variables=TUNED_VARIABLES):
+    """(variable, term, shape, number of breakpoints) of every tuned membership function"""
+    return [
+        (variable, term, shape, len(params))
+        for variable in variables
+        for term, (shape, params) in MEMBERSHIP_FUNCTIONS[variable].items()
+    ]
+
+
+def parameter_bounds(layout):
+    """
+    Bounds of every breakpoint. They reach half a universe beyond both ends, so that a
+    membership function can be non-zero at the ends of the universe, where levels 1
+    and 3 of the dataset lie.
+    """
+    bounds = []
+    for variable, _, _, size in layout:
+        low, high = UNIVERSES[variable]
+        margin = (high - low) / 2
+        bounds.extend([(low - margin, high + margin)] * size)
+    return bounds
+
+
+def encode(membership_functions, layout):
+    """Parameter vector of the membership functions"""
+    return np.array([
+        p for variable, term, _, _ in layout for p in membership_functions[variable][term][1]
+    ], dtype=float)
+
+
+def decode(vector, layout):
+    """
+    Membership functions of a parameter vector. The breakpoints of every membership
+    function are sorted, so every vector within the bounds has valid shapes; the
+    placement of the peaks is checked by constraint_violation.
+
+    Returns:
+        dict: variable -> term -> (shape, breakpoints) of the tuned variables
+    """
+    overrides = {}
+    position = 0
+    for variable, term, shape, size in layout:
+        params = np.sort(vector[position:position + size])
+        overrides.setdefault(variable, {})[term] = (shape, [round(float(p), 3) for p in params])
+        position += size
+    return overrides
+
+
+def peak(shape, params):
+    """(start, end) of the breakpoints where a membership function is 1"""
+    return (params[1], params[1]) if shape == 'trimf' else (params[1], params[2])
+
+
+def constraint_violation(overrides):
+    """
+    How far membership functions are from keeping their meaning, as a share of the
+    universe: every peak inside the universe, and the peaks of the terms of a variable
+    in the order of MEMBERSHIP_FUNCTIONS, without overlapping.
+
+    Returns:
+        float: 0 for valid membership functions
+    """
+    violation = 0.0
+    for variable, terms in overrides.items():
+        low, high = UNIVERSES[variable]
+        width = high - low
+        previous_end = None
+        for term in MEMBERSHIP_FUNCTIONS[variable]:
+            start, end = peak(*terms[term])
+            violation += (max(0.0, low - start) + max(0.0, end - high)) / width
+            if previous_end is not None:
+                violation += max(0.0, previous_end - start) / width
+            previous_end = end
+    return violation
+
+
+def evaluate(membership_functions, inputs, targets, scholarship_levels=None):
+    """
+    Score membership functions on the dataset.
+
+    Returns:
+        dict: loss (mean squared error of both scores, with UNDEFINED_PENALTY where
+            no rule fires), RMSE of each score, undefined rows and, given the
+            scholarship levels, the share of recommended types that match
+    """
+    fis = VectorizedFIS(membership_functions)
+    prediction = fis.predict(inputs[:, 0], inputs[:, 1], inputs[:, 2])
+    predicted = np.column_stack([prediction['eligibility_score'], prediction['scholarship_score']])
+
+    undefined = np.isnan(predicted).any(axis=1)
+    squared_errors = (predicted - targets) ** 2
+    row_losses = np.where(undefined, UNDEFINED_PENALTY, squared_errors.sum(axis=1))
+
+    defined = squared_errors[~undefined]
+    metrics = {
+        'loss': float(row_losses.mean()),
+        'eligibility_rmse': float(np.sqrt(defined[:, 0].mean())) if len(defined) else None,
+        'scholarship_rmse': float(np.sqrt(defined[:, 1].mean())) if len(defined) else None,
+        'undefined': int(undefined.sum())
+    }
+    if scholarship_levels is not None:
+        expected = np.array([SCHOLARSHIP_TYPE_NAMES[SCHOLARSHIP_LEVEL_TERMS[level]] for level in scholarship_levels],
+                            dtype=object)
+        metrics['type_accuracy'] = float((prediction['scholarship_type'] == expected).mean())
+    return metrics
+
+
+def _init_worker(dataset, variables, rows=None):
+    global _inputs, _targets, _layout
+    _inputs, _targets, _ = load_dataset(dataset)
+    if rows is not None:
+        _inputs, _targets = _inputs[rows], _targets[rows]
+    _layout = parameter_layout(variables)
+
+
+def _objective(vector):
+    """Worker task: loss of one candidate parameter vector"""
+    overrides = decode(vector, _layout)
+    violation = constraint_violation(overrides)
+    if violation > 0:
+        return CONSTRAINT_PENALTY + violation
+    return evaluate(merge_membership_functions(overrides), _inputs, _targets)['loss']
+
+
+def search(dataset, variables, workers, population, generations, seed, rows=None):
+    """
+    Run differential evolution on the given rows of the dataset (default: all).
+
+    Returns:
+        tuple: (overrides of the best membership functions, OptimizeResult)
+    """
+    layout = parameter_layout(variables)
+    started = time.perf_counter()
+    generation = 0
+
+    def report(xk, convergence):
+        nonlocal generation
+        generation += 1
+        if generation % 10 == 0:
+            print(f'generation {generation}: best loss {_objective(xk):.4f} ({time.perf_counter() - started:.1f}s)')
+
+    # The progress report evaluates in this process
+    _init_worker(dataset, variables, rows)
+    with Pool(workers, initializer=_init_worker, initargs=(dataset, variables, rows)) as pool:
+        result = differential_evolution(
+            _objective, parameter_bounds(layout), popsize=population, maxiter=generations, seed=seed,
+            # Start from the hand-picked membership functions
+            x0=encode(MEMBERSHIP_FUNCTIONS, layout),
+            updating='deferred', workers=pool.map, polish=False, callback=report
+        )
+    return decode(result.x, layout), result
+
+
+def cross_validate(dataset, variables, folds, workers, population, generations, seed):
+    """
+    Tune on all but one fold of the rows and score the held-out fold, for every fold.
+
+    Returns:
+        dict: Mean held-out loss of the tuned and of the hand-picked membership
+            functions, and the held-out metrics of every fold
+    """
+    inputs, targets, scholarship_levels = load_dataset(dataset)
+    order = np.random.default_rng(seed).permutation(len(inputs))
+
+    results = []
+    for fold, held_out in enumerate(np.array_split(order, folds)):
+        print(f'Fold {fold + 1} of {folds}: holding out {len(held_out)} rows')
+        training = np.setdiff1d(order, held_out)
+        overrides, _ = search(dataset, variables, workers, population, generations, seed, training)
+        results.append({
+            'rows': len(held_out),
+            'baseline': evaluate(MEMBERSHIP_FUNCTIONS, inputs[held_out], targets[held_out],
+                                 scholarship_levels[held_out]),
+            'tuned': evaluate(merge_membership_functions(overrides), inputs[held_out], targets[held_out],
+                              scholarship_levels[held_out])
+        })
+
+    # Weighted by fold size, so this is the mean loss over all held-out rows
+    def held_out_loss(model):
+        return float(sum(fold[model]['loss'] * fold['rows'] for fold in results) / len(inputs))
+
+    return {
+        'folds': folds,
+        'baselineLoss': held_out_loss('baseline'),
+        'tunedLoss': held_out_loss('tuned'),
+        'perFold': results
+    }
+
+
+def tune(dataset=DEFAULT_DATASET, variables=TUNED_VARIABLES, workers=None, population=15,
+         generations=200, seed=0, folds=5):
+    """
+    Search the membership functions of the given variables.
+
+    Args:
+        folds (int): Folds of the cross-validation; 0 skips it, the number of rows
+            gives leave-one-out
+
+    Returns:
+        dict: Configuration with the tuned membership functions, their version and
+            the metrics before and after tuning
+    """
+    workers = workers or os.cpu_count() or 1
+    layout = parameter_layout(variables)
+    inputs, targets, scholarship_levels = load_dataset(dataset)
+    if folds and not 2 <= folds <= len(inputs):
+        raise ValueError(f'folds must be between 2 and {len(inputs)}, or 0')
+
+    baseline = evaluate(MEMBERSHIP_FUNCTIONS, inputs, targets, scholarship_levels)
+    print(f"Hand-picked: loss {baseline['loss']:.4f}, {baseline['undefined']} of {len(inputs)} rows undefined")
+    print(f'Tuning {len(parameter_bounds(layout))} breakpoints of {", ".join(variables)} on {workers} workers')
+
+    started = time.perf_counter()
+    overrides, result = search(dataset, variables, workers, population, generations, seed)
+    membership_functions = merge_membership_functions(overrides)
+    tuned = evaluate(membership_functions, inputs, targets, scholarship_levels)
+    print(f"Tuned: loss {tuned['loss']:.4f}, {tuned['undefined']} of {len(inputs)} rows undefined "
+          f"after {result.nit} generations, {result.nfev} evaluations in {time.perf_counter() - started:.1f}s")
+
+    cross_validation = None
+    if folds:
+        cross_validation = cross_validate(dataset, variables, folds, workers, population, generations, seed)
+        print(f"Held-out loss over {folds} folds: tuned {cross_validation['tunedLoss']:.4f}, "
+              f"hand-picked {cross_validation['baselineLoss']:.4f}")
+    elapsed = time.perf_counter() - started
+
+    return {
+        'version': membership_functions_version(membership_functions),
+        'membership_functions': overrides,
+        'tuning': {
+            'dataset': os.path.basename(dataset),
+            'rows': len(inputs),
+            'method': 'differential_evolution',
+            'seed': seed,
+            'generations': int(result.nit),
+            'evaluations': int(result.nfev),
+            'seconds': round(elapsed, 1),
+            'baseline': baseline,
+            'tuned': tuned,
+            'crossValidation': cross_validation,
+            'generatedAt': datetime.now().isoformat()
+        }
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tune the FIS membership functions against rules.xlsx')
+    parser.add_argument('output', help='Membership function configuration to write (JSON)')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET, help='Labelled rules (.xlsx)')
+    parser.add_argument('--variables', default=','.join(TUNED_VARIABLES),
+                        help='Comma-separated fuzzy variables to tune')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--population', type=int, default=15, help='Population size per parameter')
+    parser.add_argument('--generations', type=int, default=200, help='Maximum number of generations')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--folds', type=int, default=5,
+                        help='Cross-validation folds for the held-out loss (0: skip, number of rows: leave-one-out)')
+    args = parser.parse_args(argv)
+
+    variables = tuple(variable.strip() for variable in args.variables.split(',') if variable.strip())
+    unknown = [variable for variable in variables if variable not in MEMBERSHIP_FUNCTIONS]
+    if unknown or not variables:
+        parser.error(f'Invalid variables: {args.variables}. Must be any of: {", ".join(MEMBERSHIP_FUNCTIONS)}')
+
+    try:
+        config = tune(args.dataset, variables, args.workers, args.population, args.generations, args.seed,
+                      args.folds)
+    except ValueError as e:
+        print(f'Error: {str(e)}', file=sys.stderr)
+        return 1
+    with open(args.output, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"Wrote membership functions version {config['version']} to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+
+INPUT_KEYS = ('povertyRate', 'educationLevel', 'employmentRate')
+
+
+class LatestUpdate:
+    """
+    Single-slot mailbox that keeps only the most recent update.
+
+    While the client sends faster than updates are evaluated, every update that
+    arrives before the previous one is taken replaces it and is counted as dropped.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._update = None
+        self._dropped = 0
+        self._closed = False
+
+    def put(self, update):
+        with self._condition:
+            if self._update is not None:
+                self._dropped += 1
+            self._update = update
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def take(self):
+        """
+        Wait for the next update.
+
+        Returns:
+            tuple: (update, number of updates dropped since the last take), or
+                (None, 0) once the mailbox is closed and empty
+        """
+        with self._condition:
+            while self._update is None and not self._closed:
+                self._condition.wait()
+            update, dropped = self._update, self._dropped
+            self._update, self._dropped = None, 0
+            return update, dropped
+
+
+def evaluate_update(message, evaluators):
+    """
+    Evaluate one update of the slider inputs.
+
+    Args:
+        message (str): JSON with povertyRate, educationLevel and employmentRate (0-1),
+            and optionally seq and models (default: all models)
+        evaluators (dict): Model name -> evaluate_country function
+
+    Returns:
+        dict: seq echoed back and per-model results in the shape of evaluate_country,
+            or an error
+    """
+    try:
+        update = json.loads(message)
+    except ValueError:
+        return {'error': 'Invalid JSON'}
+    if not isinstance(update, dict):
+        return {'error': 'Expected a JSON object'}
+
+    response = {'seq': update.get('seq')}
+    try:
+        country = {key: float(update[key]) for key in INPUT_KEYS}
+    except KeyError as e:
+        response['error'] = f'Missing required parameter: {e.args[0]}'
+        return response
+    except (TypeError, ValueError):
+        response['error'] = 'Parameters must be numbers'
+        return response
+
+    models = update.get('models') or list(evaluators)
+    if not isinstance(models, list) or not all(isinstance(model, str) for model in models):
+        response['error'] = 'models must be a list of model names'
+        return response
+
+    models = [model.lower() for model in models]
+    unknown = [model for model in models if model not in evaluators]
+    if unknown:
+        response['error'] = f'Invalid models: {", ".join(unknown)}. Must be any of: {", ".join(evaluators)}'
+        return response
+
+    response['results'] = {}
+    for model in models:
+        try:
+            response['results'][model] = evaluators[model](country)
+        except Exception as e:
+            response['results'][model] = {'error': str(e)}
+    return response
+
+
+def serve(ws, evaluators, on_error=None):
+    """
+    Run a live prediction session on a WebSocket until the client disconnects.
+
+    A receiver thread reads updates into a LatestUpdate mailbox, so reading never
+    waits for an evaluation, and the calling thread evaluates whatever update is
+    newest whenever it is free. Each response reports how many updates it superseded.
+
+    Args:
+        ws: flask-sock WebSocket
+        evaluators (dict): Model name -> evaluate_country function
+        on_error (callable): Called with unexpected exceptions of the receiver and
+            of evaluating an update
+    """
+    mailbox = LatestUpdate()
+
+    def receive():
+        try:
+            while True:
+                mailbox.put(ws.receive())
+        except Exception as e:
+            # ConnectionClosed when the client goes away
+            if ws.connected and on_error:
+                on_error(e)
+        finally:
+            mailbox.close()
+
+    threading.Thread(target=receive, name='live-updates-receiver', daemon=True).start()
+
+    while True:
+        message, dropped = mailbox.take()
+        if message is None:
+            return
+
+        started = time.perf_counter()
+        try:
+            response = evaluate_update(message, evaluators)
+        except Exception as e:
+            # A malformed update must not end the session
+            if on_error:
+                on_error(e)
+            response = {'error': 'Invalid update'}
+        response['dropped'] = dropped
+        response['elapsedMs'] = round((time.perf_counter() - started) * 1000, 3)
+        try:
+            ws.send(json.dumps(response))
+        except Exception:
+            return
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+# Default location of the versioned ANN artifacts
+DEFAULT_REGISTRY_DIR = os.environ.get(
+    'ANN_MODEL_REGISTRY',
+    os.path.join(os.path.dirname(__file__), 'models')
+)
+
+MODEL_FILENAME = 'model.h5'
+METADATA_FILENAME = 'metadata.json'
+ACTIVE_FILENAME = 'ACTIVE'
+
+# Version name of the model shipped with the repository, which is not in the registry
+BUILTIN_VERSION = 'builtin'
+
+# Scaling constants of the model shipped with the repository
+DEFAULT_SCALING = {
+    'x_min': [1, 1, 1],
+    'x_max': [3, 3, 3],
+    'y_min': [1, 1],
+    'y_max': [3, 3]
+}
+
+
+class ModelRegistry:
+    """
+    Local, directory-based registry of versioned ANN model artifacts.
+
+    Layout:
+        <root>/<version>/model.h5       Keras model
+        <root>/<version>/metadata.json  Scaling constants and free-form info
+        <root>/ACTIVE                   Name of the version served on startup
+
+    Registering a version never changes what is served; only set_active does.
+    """
+
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        self.root = root
+
+    def list_versions(self):
+        """Returns the registered versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        versions = [
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, METADATA_FILENAME))
+            and os.path.isfile(os.path.join(self.root, name, MODEL_FILENAME))
+        ]
+        return sorted(versions, key=lambda v: os.path.getmtime(os.path.join(self.root, v)))
+
+    def model_path(self, version):
+        return os.path.join(self.root, version, MODEL_FILENAME)
+
+    def load_metadata(self, version):
+        """
+        Load the metadata of a version.
+
+        Raises:
+            KeyError: If the version is not registered
+            ValueError: If the scaling constants are missing or malformed
+        """
+        if version not in self.list_versions():
+            raise KeyError(f'Unknown model version: {version}')
+
+        with open(os.path.join(self.root, version, METADATA_FILENAME)) as f:
+            metadata = json.load(f)
+
+        for key, size in (('x_min', 3), ('x_max', 3), ('y_min', 2), ('y_max', 2)):
+            if len(metadata.get(key, [])) != size:
+                raise ValueError(f'Model version {version} has invalid "{key}" in {METADATA_FILENAME}')
+        return metadata
+
+    def get_active(self):
+        """
+        Returns the active version. Without an ACTIVE file, or when it names a version
+        that is not registered, the builtin model is active.
+        """
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILENAME)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return BUILTIN_VERSION
+
+        return version if version in self.list_versions() else BUILTIN_VERSION
+
+    def set_active(self, version):
+        """Record the active version, or 'builtin', so that restarted workers pick it up."""
+        if version != BUILTIN_VERSION and version not in self.list_versions():
+            raise KeyError(f'Unknown model version: {version}')
+        os.makedirs(self.root, exist_ok=True)
+
+        # Write then rename so readers never see a partial file
+        tmp_path = os.path.join(self.root, ACTIVE_FILENAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILENAME))
+
+    def register(self, version, model_file, scaling=None, **info):
+        """
+        Copy a trained model into the registry together with its scaling metadata.
+
+        Args:
+            version (str): Version name, used as directory name
+            model_file (str): Path to the Keras .h5 file
+            scaling (dict): x_min, x_max, y_min and y_max used during training
+            **info: Extra metadata stored alongside (e.g. training data, metrics)
+
+        Returns:
+            str: The registered version
+        """
+        if not version or os.sep in version or version.startswith('.') or version == BUILTIN_VERSION:
+            raise ValueError(f'Invalid model version name: {version!r}')
+
+        version_dir = os.path.join(self.root, version)
+        if os.path.exists(version_dir):
+            raise ValueError(f'Model version {version} already exists')
+
+        metadata = dict(DEFAULT_SCALING if scaling is None else scaling)
+        metadata.update(info)
+        metadata.setdefault('registeredAt', datetime.now().isoformat())
+
+        # Stage in a temporary directory so a half-copied version is never listed
+        staging_dir = version_dir + '.tmp'
+        os.makedirs(staging_dir, exist_ok=True)
+        shutil.copyfile(model_file, os.path.join(staging_dir, MODEL_FILENAME))
+        with open(os.path.join(staging_dir, METADATA_FILENAME), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(staging_dir, version_dir)
+
+        return version
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the versioned ANN model registry')
+    parser.add_argument('--root', default=DEFAULT_REGISTRY_DIR, help='Registry directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='List registered versions')
+
+    register_parser = subparsers.add_parser('register', help='Register a trained model')
+    register_parser.add_argument('version')
+    register_parser.add_argument('model_file')
+    register_parser.add_argument('--metadata', help='JSON file with x_min, x_max, y_min, y_max')
+    register_parser.add_argument('--activate', action='store_true', help='Make it the startup version')
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+
+    if args.command == 'list':
+        active = registry.get_active()
+        for name in [BUILTIN_VERSION] + registry.list_versions():
+            print(f"{'*' if name == active else ' '} {name}")
+    elif args.command == 'register':
+        scaling = None
+        if args.metadata:
+            with open(args.metadata) as f:
+                scaling = json.load(f)
+        registry.register(args.version, args.model_file, scaling)
+        if args.activate:
+            registry.set_active(args.version)
+        print(f'Registered {args.version}')
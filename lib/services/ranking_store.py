@@ -0,0 +1,226 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Rankings older than this are served but refreshed in the background
+RANKING_TTL_SECONDS = float(os.environ.get('RANKING_TTL_SECONDS', 3600))
+# How often the scheduler looks for stale rankings
+RANKING_REFRESH_INTERVAL_SECONDS = float(os.environ.get('RANKING_REFRESH_INTERVAL_SECONDS', 60))
+# Optional JSON file so stored rankings survive restarts
+RANKING_STORE_PATH = os.environ.get('RANKING_STORE_PATH')
+# Rankings kept, least recently used are dropped first
+RANKING_STORE_SIZE = int(os.environ.get('RANKING_STORE_SIZE', 1000))
+
+
+def fingerprint(countries):
+    """Stable hash of a country portfolio, independent of key order"""
+    return hashlib.sha256(json.dumps(countries, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class RankingStore:
+    """
+    Precomputed country rankings per (NGO, model), served stale-while-revalidate.
+
+    A stored ranking is returned as long as the NGO sends the same portfolio. When
+    it is older than the TTL or the model version changed, it is still returned
+    and a refresh is started in the background. A changed portfolio is computed
+    synchronously, since the stored ranking would answer a different question.
+
+    Changes are written to the file by the scheduler, not on every computation.
+    """
+
+    def __init__(self, compute, model_version, ttl=RANKING_TTL_SECONDS, path=RANKING_STORE_PATH,
+                 size=RANKING_STORE_SIZE):
+        """
+        Args:
+            compute (callable): compute(model_type, countries) -> sorted results
+            model_version (callable): model_version(model_type) -> version string
+            ttl (float): Seconds after which a ranking is refreshed
+            path (str): JSON file to persist rankings to, or None
+            size (int): Maximum number of stored rankings
+        """
+        self.compute = compute
+        self.model_version = model_version
+        self.ttl = ttl
+        self.path = path
+        self.size = size
+
+        # Least recently used first
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Serializes writers of the file
+        self._save_lock = threading.Lock()
+        self._scheduler = None
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for entry in json.load(f):
+                self._entries[(entry['ngoId'], entry['modelType'])] = entry
+        self._evict()
+
+    def _evict(self):
+        # Callers hold _lock, except during __init__
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Write the stored rankings to the file if they changed since the last save"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                entries = list(self._entries.values())
+                self._dirty = False
+
+            # A unique temporary file in the same directory, renamed over the store
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                            prefix='.rankings-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _compute_entry(self, ngo_id, model_type, countries):
+        # Read the version first so a swap during the computation marks the entry stale
+        version = self.model_version(model_type)
+        entry = {
+            'ngoId': ngo_id,
+            'modelType': model_type,
+            'countries': countries,
+            'fingerprint': fingerprint(countries),
+            'modelVersion': version,
+            'computedAt': datetime.now().isoformat(),
+            'computedAtEpoch': time.time(),
+            'results': self.compute(model_type, countries)
+        }
+        with self._lock:
+            self._entries[(ngo_id, model_type)] = entry
+            self._entries.move_to_end((ngo_id, model_type))
+            self._evict()
+            self._dirty = True
+        return entry
+
+    def _is_stale(self, entry):
+        return (time.time() - entry['computedAtEpoch'] > self.ttl
+                or entry['modelVersion'] != self.model_version(entry['modelType']))
+
+    @staticmethod
+    def _freshness(entry, stale, source):
+        return {
+            'computedAt': entry['computedAt'],
+            'ageSeconds': round(time.time() - entry['computedAtEpoch'], 3),
+            'modelVersion': entry['modelVersion'],
+            'stale': stale,
+            'source': source
+        }
+
+    def get(self, ngo_id, model_type, countries, force_refresh=False):
+        """
+        Get the ranking of an NGO's portfolio.
+
+        Args:
+            ngo_id (str): NGO the ranking is stored for, or None to compute it
+                without storing it
+
+        Returns:
+            tuple: (results, freshness) where freshness has computedAt, ageSeconds,
+                modelVersion, stale and source ('store' or 'computed')
+        """
+        if ngo_id is None:
+            entry = {
+                'modelVersion': self.model_version(model_type),
+                'computedAt': datetime.now().isoformat(),
+                'computedAtEpoch': time.time(),
+                'results': self.compute(model_type, countries)
+            }
+            return entry['results'], self._freshness(entry, False, 'computed')
+
+        with self._lock:
+            entry = self._entries.get((ngo_id, model_type))
+            if entry is not None:
+                self._entries.move_to_end((ngo_id, model_type))
+
+        if force_refresh or entry is None or entry['fingerprint'] != fingerprint(countries):
+            entry = self._compute_entry(ngo_id, model_type, countries)
+            return entry['results'], self._freshness(entry, False, 'computed')
+
+        stale = self._is_stale(entry)
+        if stale:
+            self.refresh_async(ngo_id, model_type)
+        return entry['results'], self._freshness(entry, stale, 'store')
+
+    def refresh_async(self, ngo_id, model_type):
+        """Recompute a stored ranking in the background, once at a time per key"""
+        key = (ngo_id, model_type)
+        with self._lock:
+            if key in self._refreshing or key not in self._entries:
+                return
+            self._refreshing.add(key)
+            countries = self._entries[key]['countries']
+
+        def refresh():
+            try:
+                self._compute_entry(ngo_id, model_type, countries)
+            except Exception as e:
+                print(f"Error refreshing ranking for NGO {ngo_id} ({model_type}): {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f'ranking-refresh-{ngo_id}-{model_type}', daemon=True).start()
+
+    def refresh_stale(self):
+        """Start a refresh for every stored ranking that is stale"""
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            if self._is_stale(entry):
+                self.refresh_async(entry['ngoId'], entry['modelType'])
+
+    def start_scheduler(self, interval=RANKING_REFRESH_INTERVAL_SECONDS):
+        """Periodically refresh stale rankings and save changes in a daemon thread"""
+        if self._scheduler is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.refresh_stale()
+                try:
+                    self.save()
+                except OSError as e:
+                    print(f"Error saving rankings to {self.path}: {str(e)}")
+
+        # Keep what changed since the last scheduled save
+        atexit.register(self.save)
+        self._scheduler = threading.Thread(target=run, name='ranking-scheduler', daemon=True)
+        self._scheduler.start()
+
+    def status(self):
+        """Freshness of every stored ranking"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            dict(self._freshness(entry, self._is_stale(entry), 'store'),
+                 ngoId=entry['ngoId'], modelType=entry['modelType'], countries=len(entry['countries']))
+            for entry in entries
+        ]
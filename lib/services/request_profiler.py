@@ -0,0 +1,115 @@
+import hmac
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Profiling is allowed for every caller when enabled, otherwise only with the admin token
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_MS', 1)) / 1000
+
+# 'store' writes the profile to PROFILE_DIR, 'return' sends it as the response body
+MODES = ('store', 'return')
+
+
+def requested_mode(value, admin_token=None):
+    """
+    Decide whether a request gets profiled.
+
+    Args:
+        value (str): Value of the X-Profile header or ?profile= query parameter
+        admin_token (str): Value of the X-Admin-Token header
+
+    Returns:
+        str: 'store' or 'return', or None when not requested or not allowed
+    """
+    if not value:
+        return None
+
+    mode = value.lower()
+    if mode in ('1', 'true'):
+        mode = 'store'
+    if mode not in MODES:
+        return None
+
+    allowed = PROFILING_ENABLED or (
+        bool(ADMIN_TOKEN) and bool(admin_token) and hmac.compare_digest(admin_token, ADMIN_TOKEN)
+    )
+    return mode if allowed else None
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of the thread that enters it at a fixed interval.
+
+    Samples are aggregated as collapsed stacks ("outer;inner;innermost count"),
+    the input format of flamegraph.pl, speedscope and inferno. Only the profiled
+    request pays for the sampling thread.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = Counter()
+        self.duration = 0.0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def stop(self):
+        """Stop sampling; safe to call more than once"""
+        if self._sampler is None or self._stop.is_set():
+            return
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples in collapsed stack format, most frequent first"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+    def save(self, label):
+        """
+        Write the collapsed stacks to PROFILE_DIR.
+
+        Returns:
+            str: Path of the written .folded file
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label).strip('_') or 'request'
+        path = os.path.join(PROFILE_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_label}.folded")
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+        return path
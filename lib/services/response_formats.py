@@ -0,0 +1,138 @@
+import gzip
+import json
+from flask import Response, request
+
+# Optional faster encoders; fall back to the standard library when not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.scholarjim.columnar+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# Shorthands accepted in the ?format= query parameter
+FORMAT_ALIASES = {
+    'json': JSON_MIMETYPE,
+    'columnar': COLUMNAR_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE
+}
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+DETAIL_KEYS = ('povertyRate', 'educationLevel', 'employmentRate')
+
+
+def dumps_json(payload):
+    """Serialize to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def to_columnar(payload):
+    """
+    Convert an evaluation response to a column-per-field layout.
+
+    Keys are sent once instead of once per result, and the details are sent as
+    numbers instead of strings.
+
+    Args:
+        payload (dict): Response with a 'results' list as built by evaluate_countries
+
+    Returns:
+        dict: Same metadata, with 'results' replaced by 'count' and 'columns'
+    """
+    results = payload.get('results', [])
+    type_names = list(results[0]['scholarshipTypes']) if results else []
+
+    columns = {
+        'country': [r['country'] for r in results],
+        'score': [r['score'] for r in results],
+        'recommendedType': [r['recommendedType'] for r in results],
+        'scholarshipTypes': {
+            name: [r['scholarshipTypes'].get(name, 0.0) for r in results]
+            for name in type_names
+        },
+        'details': {
+            key: [float(r['details'][key]) for r in results]
+            for key in DETAIL_KEYS
+        }
+    }
+
+    # Results of countries referenced by id
+    if any('countryId' in r for r in results):
+        columns['countryId'] = [r.get('countryId') for r in results]
+
+    columnar = {key: value for key, value in payload.items() if key != 'results'}
+    columnar['count'] = len(results)
+    columnar['columns'] = columns
+    return columnar
+
+
+def _choose_mimetype():
+    requested = request.args.get('format')
+    if requested:
+        return FORMAT_ALIASES.get(requested.lower())
+
+    available = [JSON_MIMETYPE, COLUMNAR_MIMETYPE]
+    if msgpack is not None:
+        available.append(MSGPACK_MIMETYPE)
+    # JSON comes first so that */* and missing Accept headers keep the default shape
+    return request.accept_mimetypes.best_match(available, default=JSON_MIMETYPE)
+
+
+def _choose_encoding():
+    encodings = request.accept_encodings
+    if brotli is not None and encodings['br']:
+        return 'br'
+    if encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def make_evaluation_response(payload):
+    """
+    Build the HTTP response for an evaluation payload, honouring the Accept and
+    Accept-Encoding headers (or the ?format= query parameter).
+
+    The default is the regular JSON body, uncompressed unless the client asks for it.
+    """
+    mimetype = _choose_mimetype()
+
+    if mimetype == JSON_MIMETYPE:
+        body = dumps_json(payload)
+    elif mimetype == COLUMNAR_MIMETYPE:
+        body = dumps_json(to_columnar(payload))
+    elif mimetype == MSGPACK_MIMETYPE and msgpack is not None:
+        # Binary bodies always use the columnar layout
+        body = msgpack.packb(to_columnar(payload), use_single_float=False)
+    else:
+        return Response(
+            dumps_json({'error': f'Unsupported format. Must be one of: {", ".join(FORMAT_ALIASES)}'}),
+            status=406,
+            mimetype=JSON_MIMETYPE
+        )
+
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    encoding = _choose_encoding() if len(body) >= MIN_COMPRESS_SIZE else None
+    if encoding == 'br':
+        body = brotli.compress(body, quality=5)
+        headers['Content-Encoding'] = 'br'
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(body, mimetype=mimetype, headers=headers)
@@ -1,27 +1,141 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+import hmac
 import json
+import os
+import threading
 import traceback
 from datetime import datetime
 
+try:
+    from flask_sock import Sock
+except ImportError:
+    # The live prediction WebSocket is optional (pip install flask-sock)
+    Sock = None
+
 # Import both models
 try:
     from .FIS import fis_predictor
-    from .ANN import ann_predictor
+    from .ANN import ann_predictor, SCHOLARSHIP_TYPES
+    from .response_formats import make_evaluation_response
+    from .request_profiler import SamplingProfiler, requested_mode
+    from .ranking_store import RankingStore
+    from .fis_engine import VectorizedFIS
+    from . import live_updates
+    from .country_registry import CountryRegistry, UndefinedScoreError
 except ImportError:
     # Direct import for development
     from FIS import fis_predictor
-    from ANN import ann_predictor
+    from ANN import ann_predictor, SCHOLARSHIP_TYPES
+    from response_formats import make_evaluation_response
+    from request_profiler import SamplingProfiler, requested_mode
+    from ranking_store import RankingStore
+    from fis_engine import VectorizedFIS
+    import live_updates
+    from country_registry import CountryRegistry, UndefinedScoreError
 
 app = Flask(__name__)
 
+# Token required by the /admin endpoints; they are disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def is_admin_request():
+    """Check the X-Admin-Token header against ADMIN_TOKEN"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+# The FIS simulators keep state between compute calls, so evaluations must not overlap
+fis_lock = threading.Lock()
+
+def rank_countries(model_type, countries):
+    """Evaluate countries with the FIS or ANN model, sorted by score in descending order"""
+    results = []
+    if model_type == 'FIS':
+        with fis_lock:
+            for country in countries:
+                print("country",country)
+                results.append(fis_predictor.evaluate_country(country))
+    else:
+        for country in countries:
+            print("country",country)
+            results.append(ann_predictor.evaluate_country(country))
+
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results
+
+def model_version(model_type):
+    return fis_predictor.version if model_type == 'FIS' else ann_predictor.version
+
+# Per-NGO rankings, refreshed in the background when stale
+ranking_store = RankingStore(rank_countries, model_version)
+ranking_store.start_scheduler()
+
+# Follow ANN versions activated through other server processes
+ann_predictor.start_watcher()
+
+# Evaluates single inputs for the live channel without locking, much faster than skfuzzy
+fis_engine = VectorizedFIS(fis_predictor.membership_functions)
+
+# Country parameters referenced by id in /evaluate/countries
+country_registry = CountryRegistry()
+
+def evaluate_fis_batch(inputs):
+    """Evaluate pre-scaled FIS inputs of many countries at once"""
+    prediction = fis_engine.predict(inputs[:, 0], inputs[:, 1], inputs[:, 2])
+    return (prediction['eligibility_score'], fis_engine.scholarship_type_names,
+            prediction['scholarship_memberships'], prediction['scholarship_type'])
+
+def evaluate_ann_batch(inputs):
+    """Evaluate pre-scaled ANN inputs of many countries at once"""
+    eligibility, scholarship = ann_predictor.predict_batch(inputs)
+    # Normalize eligibility score to 0-1 range
+    return ((eligibility - 1) / 2, SCHOLARSHIP_TYPES,
+            ann_predictor.get_scholarship_weights(scholarship), ann_predictor.get_scholarship_types(scholarship))
+
+BATCH_EVALUATORS = {'FIS': evaluate_fis_batch, 'ANN': evaluate_ann_batch}
+
 # Set CORS headers
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Profile,X-Admin-Token')
+    response.headers.add('Access-Control-Expose-Headers', 'X-Profile-File,X-Profile-Duration')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+# Opt-in request profiling: X-Profile header or ?profile= query parameter,
+# allowed with PROFILING_ENABLED or a valid X-Admin-Token
+@app.before_request
+def start_profiling():
+    mode = requested_mode(
+        request.headers.get('X-Profile') or request.args.get('profile'),
+        request.headers.get('X-Admin-Token')
+    )
+    if mode:
+        g.profile_mode = mode
+        g.profiler = SamplingProfiler().__enter__()
+
+@app.after_request
+def finish_profiling(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+
+    profiler.stop()
+    if g.pop('profile_mode') == 'return':
+        return Response(profiler.collapsed(), status=response.status_code, mimetype='text/plain',
+                        headers={'X-Profile-Duration': f'{profiler.duration:.6f}'})
+
+    response.headers['X-Profile-File'] = profiler.save(request.path)
+    response.headers['X-Profile-Duration'] = f'{profiler.duration:.6f}'
+    return response
+
+@app.teardown_request
+def stop_profiling(exception):
+    # Make sure the sampler stops even if the request failed before after_request
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
@@ -31,6 +145,10 @@ def health_check():
         'services': {
             'fis': 'available',
             'ann': 'available'
+        },
+        'models': {
+            'fis': fis_predictor.version,
+            'ann': ann_predictor.version
         }
     })
 
@@ -62,7 +180,8 @@ def predict(model_type):
             education_scaled = education_level * 100  # 0-1 → 0-100
             employment_scaled = employment_rate * 100  # 0-1 → 0-80
             
-            result = fis_predictor.predict(poverty_scaled, education_scaled, employment_scaled)
+            with fis_lock:
+                result = fis_predictor.predict(poverty_scaled, education_scaled, employment_scaled)
         elif model_type.lower() == 'ann':
             # ANN expects values in 1-3 range
             poverty_scaled = 1 + (poverty_rate * 2)  # 0-1 → 1-3
@@ -102,42 +221,76 @@ def evaluate_countries():
             
         model_type = data.get('modelType', 'FIS').upper()
         countries = data.get('countries', [])
+        country_ids = data.get('countryIds', [])
         ngo_id = data.get('ngoId', '1')
         
-        if not countries:
+        if not countries and not country_ids:
             return jsonify({'error': 'No countries provided'}), 400
+
+        if countries and country_ids:
+            return jsonify({'error': 'Provide either countries or countryIds, not both'}), 400
             
-        # Select model based on type
-        if model_type.upper() == 'FIS':
-            predictor = fis_predictor
-        elif model_type.upper() == 'ANN':
-            predictor = ann_predictor
-        else:
+        if model_type not in ('FIS', 'ANN'):
             return jsonify({'error': f'Invalid model type: {model_type}. Must be "FIS" or "ANN"'}), 400
+
+        if not isinstance(ngo_id, (str, int)) or isinstance(ngo_id, bool):
+            return jsonify({'error': 'ngoId must be a string or number'}), 400
+
+        if country_ids:
+            return evaluate_country_ids(ngo_id, model_type, country_ids)
             
-        # Process each country
-        results = []
-        for country in countries:
-            print("country",country)
-            results.append(predictor.evaluate_country(country))
-            
-        # Sort results by score in descending order
-        results.sort(key=lambda x: x['score'], reverse=True)
+        # Serve the stored ranking of this NGO when the portfolio is unchanged. Requests
+        # without an ngoId are computed but not stored under the default id.
+        results, freshness = ranking_store.get(str(ngo_id) if 'ngoId' in data else None, model_type, countries,
+                                               force_refresh=bool(data.get('refresh', False)))
         
         # Create final response
         response = {
             'ngoId': ngo_id,
             'modelType': model_type,
             'generatedAt': datetime.now().isoformat(),
+            'freshness': freshness,
             'results': results
         }
         
-        return jsonify(response)
+        return make_evaluation_response(response)
     except Exception as e:
         app.logger.error(f"Error in evaluation: {str(e)}")
         app.logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+def evaluate_country_ids(ngo_id, model_type, country_ids):
+    """Evaluate countries of the country registry, vectorized and cached per country"""
+    if not isinstance(country_ids, list) or not all(isinstance(country_id, str) and country_id
+                                                    for country_id in country_ids):
+        return jsonify({'error': 'countryIds must be a list of country id strings'}), 400
+
+    try:
+        results, data_version = country_registry.evaluate(model_type, country_ids, model_version(model_type),
+                                            BATCH_EVALUATORS[model_type])
+    except KeyError as e:
+        return jsonify({'error': f'Unknown country ids: {e.args[0]}'}), 400
+    except UndefinedScoreError as e:
+        # The request is valid, but the model cannot score these countries
+        return jsonify({'error': str(e)}), 422
+
+    # Sort results by score in descending order
+    results = sorted(results, key=lambda x: x['score'], reverse=True)
+
+    response = {
+        'ngoId': ngo_id,
+        'modelType': model_type,
+        'generatedAt': datetime.now().isoformat(),
+        'countryDataVersion': data_version,
+        'results': results
+    }
+    return make_evaluation_response(response)
+
+@app.route('/countries', methods=['GET'])
+def list_countries():
+    """List the countries that can be referenced by id"""
+    return jsonify(country_registry.describe())
+
 # Direct country evaluation endpoints for specific models
 @app.route('/evaluate/fis/countries', methods=['POST'])
 def evaluate_countries_fis():
@@ -161,6 +314,85 @@ def evaluate_countries_ann():
         app.logger.error(f"Error in ANN evaluation: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Model management endpoints
+@app.route('/admin/models/ann', methods=['GET'])
+def ann_model_status():
+    """Show the served, previous and available ANN model versions"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(ann_predictor.status())
+
+@app.route('/admin/models/ann/activate', methods=['POST'])
+def activate_ann_model():
+    """Load and warm up an ANN model version in the background, then swap it in"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        data = request.get_json() or {}
+        version = data.get('version')
+
+        if not version:
+            return jsonify({'error': 'Missing required parameter: version'}), 400
+
+        if not ann_predictor.activate(version):
+            return jsonify({'error': 'Another model version is still loading'}), 409
+
+        return jsonify(ann_predictor.status()), 202
+    except KeyError as e:
+        # str() of a KeyError quotes the message
+        return jsonify({'error': e.args[0]}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error activating model: {str(e)}")
+        app.logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/models/ann/rollback', methods=['POST'])
+def rollback_ann_model():
+    """Swap back to the previously served ANN model version"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    if ann_predictor.rollback() is None:
+        return jsonify({'error': 'No previous model version to roll back to'}), 409
+    return jsonify(ann_predictor.status())
+
+@app.route('/admin/countries/reload', methods=['POST'])
+def reload_countries():
+    """Load the country file again, e.g. after publishing a new data version"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        data = country_registry.reload()
+    except (OSError, ValueError) as e:
+        return jsonify({'error': str(e), 'version': country_registry.version}), 400
+    return jsonify({'version': data.version, 'countries': len(data.ids)})
+
+@app.route('/admin/rankings', methods=['GET'])
+def ranking_status():
+    """Show the freshness of every stored NGO ranking"""
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify({'rankings': ranking_store.status()})
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/ws/predict')
+    def live_predict(ws):
+        """
+        Stream predictions while the user drags the input sliders.
+
+        Each message carries povertyRate, educationLevel and employmentRate (0-1) and
+        optionally seq and models. Updates that arrive while the previous one is being
+        evaluated are superseded by the newest one, so responses never lag behind.
+        """
+        live_updates.serve(
+            ws,
+            {'fis': fis_engine.evaluate_country, 'ann': ann_predictor.evaluate_country},
+            on_error=lambda e: app.logger.error(f"Error in live predictions: {str(e)}")
+        )
+
 if __name__ == '__main__':
     print("Starting Scholar Jim AI Models Server...")
     print("Available endpoints:")
@@ -170,4 +402,12 @@ if __name__ == '__main__':
     print("  - /evaluate/countries")
     print("  - /evaluate/fis/countries")
     print("  - /evaluate/ann/countries")
+    print("  - /countries")
+    print("  - /admin/models/ann")
+    print("  - /admin/models/ann/activate")
+    print("  - /admin/models/ann/rollback")
+    print("  - /admin/countries/reload")
+    print("  - /admin/rankings")
+    if Sock is not None:
+        print("  - /ws/predict (WebSocket)")
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
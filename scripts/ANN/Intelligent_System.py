@@ -1,3 +1,8 @@
+import argparse
+import glob
+import os
+import sys
+
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras.models import Sequential
@@ -5,28 +10,87 @@ from tensorflow.keras.layers import Dense, Dropout
 import numpy as np
 import pandas as pd
 
-# Load the Excel file
-file_path = "rules.xlsx"  # Ensure the file is in the same directory
-xls = pd.ExcelFile(file_path)
+# Rows held in the shuffle buffer when training on shards
+SHUFFLE_BUFFER = 100_000
+
+parser = argparse.ArgumentParser(description='Train the scholarship ANN')
+parser.add_argument('--shards', help='Directory of .npz shards from generate_training_data.py '
+                                     '(default: train on rules.xlsx)')
+parser.add_argument('--epochs', type=int, help='Default: 150 for rules.xlsx, 5 for shards')
+parser.add_argument('--batch-size', type=int, help='Default: 5 for rules.xlsx, 1024 for shards')
+parser.add_argument('--validation-shards', type=int, default=1, help='Shards held out for validation')
+parser.add_argument('--register', metavar='VERSION',
+                    help='Register the trained model in the ANN model registry under this version')
+args = parser.parse_args()
+
+
+def shard_dataset(paths, batch_size, shuffle):
+    """Stream batches from .npz shards, holding only a few shards in memory at a time"""
+    def load_shard(path):
+        with np.load(path.decode()) as shard:
+            # Min-max scaling of the 1-3 range, the same scaling the server applies
+            yield (shard['X'] - 1) / 2, (shard['y'] - 1) / 2
+
+    signature = (tf.TensorSpec(shape=(None, 3), dtype=tf.float32),
+                 tf.TensorSpec(shape=(None, 2), dtype=tf.float32))
+
+    dataset = tf.data.Dataset.from_tensor_slices(paths)
+    if shuffle:
+        dataset = dataset.shuffle(len(paths), reshuffle_each_iteration=True)
+    # Read several shards at once so batches mix rows of different shards
+    dataset = dataset.interleave(
+        lambda path: tf.data.Dataset.from_generator(load_shard, args=(path,), output_signature=signature).unbatch(),
+        cycle_length=4, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle
+    )
+    if shuffle:
+        dataset = dataset.shuffle(SHUFFLE_BUFFER)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
 
-# Load the data from the sheet
-df = pd.read_excel(xls, sheet_name='Sheet1')
+if args.shards:
+    shard_paths = sorted(glob.glob(os.path.join(args.shards, 'shard-*.npz')))
+    if len(shard_paths) <= args.validation_shards:
+        sys.exit(f'Need more than {args.validation_shards} shards in {args.shards}, found {len(shard_paths)}')
 
-# Extract relevant data
-df_cleaned = df.iloc[3:, [1, 2, 3, 4, 5]]  # Selecting Input1, Input2, Input3, Output1, Output2
-df_cleaned.columns = ['Poverty', 'Education', 'Employment', 'Eligibility', 'Scholarship']
-df_cleaned = df_cleaned.dropna().astype(float)  # Convert to numerical values
+    epochs = args.epochs or 5
+    batch_size = args.batch_size or 1024
+    train_data = shard_dataset(shard_paths[args.validation_shards:], batch_size, shuffle=True)
+    validation_data = shard_dataset(shard_paths[:args.validation_shards], batch_size, shuffle=False)
 
-# Load the dataset
-X = df_cleaned[['Poverty', 'Education', 'Employment']].values
-y = df_cleaned[['Eligibility', 'Scholarship']].values
+    # Scaling of the inputs and outputs, stored with the model in the registry
+    scaling = {'x_min': [1, 1, 1], 'x_max': [3, 3, 3], 'y_min': [1, 1], 'y_max': [3, 3]}
+    training_data = os.path.abspath(args.shards)
+else:
+    # Load the Excel file
+    file_path = "rules.xlsx"  # Ensure the file is in the same directory
+    xls = pd.ExcelFile(file_path)
 
-# Normalize inputs (Avoid division by zero)
-X_max = np.max(X, axis=0, where=(X != 0), initial=1)  # Store max values for consistent scaling
-y_max = np.max(y, axis=0, where=(y != 0), initial=1)
+    # Load the data from the sheet
+    df = pd.read_excel(xls, sheet_name='Sheet1')
 
-X = X / X_max
-y = y / y_max
+    # Extract relevant data
+    df_cleaned = df.iloc[3:, [1, 2, 3, 4, 5]]  # Selecting Input1, Input2, Input3, Output1, Output2
+    df_cleaned.columns = ['Poverty', 'Education', 'Employment', 'Eligibility', 'Scholarship']
+    df_cleaned = df_cleaned.dropna().astype(float)  # Convert to numerical values
+
+    # Load the dataset
+    X = df_cleaned[['Poverty', 'Education', 'Employment']].values
+    y = df_cleaned[['Eligibility', 'Scholarship']].values
+
+    # Normalize inputs (Avoid division by zero)
+    X_max = np.max(X, axis=0, where=(X != 0), initial=1)  # Store max values for consistent scaling
+    y_max = np.max(y, axis=0, where=(y != 0), initial=1)
+
+    X = X / X_max
+    y = y / y_max
+
+    epochs = args.epochs or 150
+    batch_size = args.batch_size or 5
+    train_data = None
+    validation_data = None
+
+    scaling = {'x_min': [0, 0, 0], 'x_max': X_max.tolist(), 'y_min': [0, 0], 'y_max': y_max.tolist()}
+    training_data = os.path.abspath(file_path)
 
 # Define the ANN model
 # model = Sequential([
@@ -48,12 +112,27 @@ model = Sequential([
 model.compile(optimizer='adam', loss='mse', metrics=['mae'])
 
 # Train the model
-model.fit(X, y, epochs=150, batch_size=5, verbose=1)
+if train_data is not None:
+    history = model.fit(train_data, validation_data=validation_data, epochs=epochs, verbose=1)
+else:
+    history = model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
 
 # Save the model
 model.save("ann_scholarship_model.h5")
 
+if args.register:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lib', 'services'))
+    from model_registry import ModelRegistry
+
+    ModelRegistry().register(
+        args.register, "ann_scholarship_model.h5", scaling=scaling,
+        trainingData=training_data, epochs=epochs, batchSize=batch_size,
+        metrics={name: float(values[-1]) for name, values in history.history.items()}
+    )
+    print(f"Registered model version {args.register}")
+
 # Function to make predictions
 def predict_ann(input_data):
-    input_array = np.array(input_data).reshape(1, -1) / X_max  # Use stored scaling factors
+    input_array = (np.array(input_data).reshape(1, -1) - scaling['x_min']) / (
+        np.array(scaling['x_max']) - scaling['x_min'])  # Use stored scaling factors
     return model.predict(input_array)
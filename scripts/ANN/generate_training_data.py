@@ -0,0 +1,205 @@
+"""
+Generate synthetic ANN training data labelled by the FIS.
+
+Every shard is a Latin hypercube over the poverty, education and employment rates
+(0-1): each axis is split into as many strata as the shard has samples and every
+stratum is hit exactly once, so even a single shard covers the input space evenly.
+Shards are labelled in batches by the vectorized FIS and written as .npz files with
+X (inputs) and y (eligibility, scholarship) on the 1-3 scale of rules.xlsx. Inputs
+where no FIS rule fires have no label and are dropped.
+
+Shards are generated in parallel worker processes, one shard per task, so memory
+stays bounded by the shard size times the number of workers. Shard files are
+written atomically and existing ones are skipped, so an interrupted run can simply
+be restarted. The manifest is written before the first shard, and a restart with
+other settings or another FIS version is refused, since it would mix shards of
+different data sets.
+
+Usage:
+    python generate_training_data.py shards/ --samples 5000000 --workers 8
+    python Intelligent_System.py --shards shards/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'lib', 'services')
+
+MANIFEST_FILENAME = 'manifest.json'
+
+# Vectorized FIS of the worker process, created by _init_worker
+_fis_engine = None
+
+
+def _init_worker():
+    global _fis_engine
+    sys.path.insert(0, SERVICES_DIR)
+    from FIS import fis_predictor
+    from fis_engine import VectorizedFIS
+    # Labels follow the served FIS, including a tuned FIS_MF_CONFIG
+    _fis_engine = VectorizedFIS(fis_predictor.membership_functions)
+
+
+def fis_version():
+    """Version of the membership functions the shards are labelled with"""
+    sys.path.insert(0, SERVICES_DIR)
+    from FIS import fis_predictor
+    return fis_predictor.version
+
+
+def write_manifest(output_dir, manifest):
+    """
+    Record the settings of a data set, or check them against the recorded ones.
+
+    Raises:
+        ValueError: If the directory holds shards made with other settings, or shards
+            without a manifest
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    settings = ('samples', 'shardSize', 'seed', 'fisVersion')
+    has_shards = any(name.startswith('shard-') for name in os.listdir(output_dir))
+
+    if has_shards:
+        try:
+            with open(path) as f:
+                recorded = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f'{output_dir} has shards but no {MANIFEST_FILENAME}; cannot check how they were made')
+
+        changed = [key for key in settings if recorded.get(key) != manifest[key]]
+        if changed:
+            details = ', '.join(f'{key} {recorded.get(key)!r} -> {manifest[key]!r}' for key in changed)
+            raise ValueError(f'{output_dir} holds shards of another data set: {details}')
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def latin_hypercube(rng, count, dimensions=3):
+    """Sample count points in [0, 1)^dimensions, one per stratum of every axis"""
+    strata = np.column_stack([rng.permutation(count) for _ in range(dimensions)])
+    return (strata + rng.random((count, dimensions))) / count
+
+
+def label(inputs, batch_size):
+    """
+    Label inputs (0-1) with the FIS.
+
+    Returns:
+        ndarray: (n, 2) eligibility and scholarship scores (0-1), NaN where no rule fires
+    """
+    labels = np.empty((len(inputs), 2))
+    for start in range(0, len(inputs), batch_size):
+        batch = inputs[start:start + batch_size]
+        # Scale parameters to the range expected by the FIS
+        prediction = _fis_engine.predict(batch[:, 0] * 60, batch[:, 1] * 100, batch[:, 2] * 80)
+        labels[start:start + batch_size, 0] = prediction['eligibility_score']
+        labels[start:start + batch_size, 1] = prediction['scholarship_score']
+    return labels
+
+
+def shard_path(output_dir, index):
+    return os.path.join(output_dir, f'shard-{index:05d}.npz')
+
+
+def _generate_shard(task):
+    """Worker task: sample, label and write one shard"""
+    index, output_dir, shard_size, seed, batch_size = task
+    started = time.perf_counter()
+
+    # Seeded per shard, so a shard is the same no matter which worker makes it
+    rng = np.random.default_rng([seed, index])
+    inputs = latin_hypercube(rng, shard_size)
+    labels = label(inputs, batch_size)
+
+    labelled = ~np.isnan(labels).any(axis=1)
+    # 0-1 → 1-3, the scale of rules.xlsx and of the served model
+    X = (1 + inputs[labelled] * 2).astype(np.float32)
+    y = (1 + labels[labelled] * 2).astype(np.float32)
+
+    path = shard_path(output_dir, index)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, X=X, y=y)
+    os.replace(tmp_path, path)
+
+    return index, len(X), shard_size - len(X), time.perf_counter() - started
+
+
+def generate(output_dir, samples, shard_size=100_000, workers=None, seed=0, batch_size=10_000):
+    """
+    Generate the shards of a data set.
+
+    Returns:
+        dict: The manifest written to the output directory
+
+    Raises:
+        ValueError: If the output directory holds shards of another data set
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    shards = -(-samples // shard_size)
+    manifest = {
+        'shards': [os.path.basename(shard_path(output_dir, index)) for index in range(shards)],
+        'samples': samples,
+        'shardSize': shard_size,
+        'seed': seed,
+        'fisVersion': fis_version(),
+        'scale': {'x_min': [1, 1, 1], 'x_max': [3, 3, 3], 'y_min': [1, 1], 'y_max': [3, 3]},
+        'labels': 'FIS (lib/services/fis_engine.py)',
+        'generatedAt': datetime.now().isoformat()
+    }
+    # Before any shard, so an interrupted run can be checked on restart
+    write_manifest(output_dir, manifest)
+
+    # The last shard holds the remainder
+    tasks = [(index, output_dir, min(shard_size, samples - index * shard_size), seed, batch_size)
+             for index in range(shards) if not os.path.exists(shard_path(output_dir, index))]
+    print(f'{shards} shards of {shard_size} samples, {shards - len(tasks)} already done')
+
+    rows = dropped = 0
+    started = time.perf_counter()
+    with Pool(workers, initializer=_init_worker) as pool:
+        for index, shard_rows, shard_dropped, elapsed in pool.imap_unordered(_generate_shard, tasks):
+            rows += shard_rows
+            dropped += shard_dropped
+            throughput = (rows + dropped) / (time.perf_counter() - started)
+            print(f'shard {index}: {shard_rows} rows ({shard_dropped} unlabelled) in {elapsed:.2f}s, '
+                  f'{throughput:,.0f} samples/s')
+
+    elapsed = time.perf_counter() - started
+    print(f'Wrote {rows} rows, dropped {dropped} unlabelled samples in {elapsed:.1f}s')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate FIS-labelled ANN training shards')
+    parser.add_argument('output_dir', help='Directory for the .npz shards')
+    parser.add_argument('--samples', type=int, default=1_000_000, help='Samples to draw (before dropping unlabelled)')
+    parser.add_argument('--shard-size', type=int, default=100_000, help='Samples per shard')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=10_000,
+                        help='Samples labelled at once; bounds the memory of the FIS per worker')
+    args = parser.parse_args(argv)
+
+    try:
+        generate(args.output_dir, args.samples, args.shard_size, args.workers, args.seed, args.batch_size)
+    except ValueError as e:
+        print(f'Error: {str(e)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
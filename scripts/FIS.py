@@ -1,16 +1,56 @@
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-import matplotlib.pyplot as plt
-from fastapi import FastAPI, HTTPException
+import time
+
+# Startup cost per stage, in seconds; see measure_startup.py
+STARTUP_TIMINGS = {}
+_stage_started = time.perf_counter()
+
+import sys
+
+# skfuzzy imports matplotlib.pyplot as soon as it is imported, which is a large part of
+# the cold start although only /visualize draws anything. Hide pyplot while skfuzzy
+# loads; skfuzzy then treats matplotlib as absent until use_matplotlib() hands it over.
+# A pyplot imported before this module is already paid for and is left alone.
+_hide_pyplot = "matplotlib.pyplot" not in sys.modules
+if _hide_pyplot:
+    sys.modules["matplotlib.pyplot"] = None
+try:
+    import numpy as np
+    import skfuzzy
+    import skfuzzy as fuzz
+    from skfuzzy import control as ctrl
+    from skfuzzy.control import visualization as fuzz_visualization
+finally:
+    if _hide_pyplot:
+        del sys.modules["matplotlib.pyplot"]
+
+def use_matplotlib():
+    """Import pyplot on first use and make it available to skfuzzy's plotting"""
+    import matplotlib.pyplot as plt
+    fuzz_visualization.plt = plt
+    fuzz_visualization.matplotlib_present = True
+    return plt
+
+from fastapi import FastAPI, HTTPException, Header, Query, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
+import asyncio
+import copy
+import hashlib
+import inspect
 import logging
 import json
 import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
+
+from request_profiler import SamplingProfiler, requested_mode
+
+STARTUP_TIMINGS['imports'] = time.perf_counter() - _stage_started
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +60,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger("fis_api")
 
+# Admission control settings (environment variables)
+FIS_WORKERS = int(os.environ.get("FIS_WORKERS", os.cpu_count() or 1))     # Evaluations running at once
+FIS_MAX_QUEUE = int(os.environ.get("FIS_MAX_QUEUE", 16))                  # Evaluations waiting for a worker
+FIS_DEADLINE_SECONDS = float(os.environ.get("FIS_DEADLINE_SECONDS", 5))  # Default and maximum per-request deadline
+FIS_RETRY_AFTER_SECONDS = int(os.environ.get("FIS_RETRY_AFTER_SECONDS", 1))
+
+# Prebuilt fuzzy system, created at image build time with `python FIS.py --build-snapshot`
+FIS_SNAPSHOT = os.environ.get("FIS_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fis_snapshot.pkl"))
+
+# Membership function configuration written by lib/services/fis_tuning.py; the
+# hand-picked membership functions are used when unset
+FIS_MF_CONFIG = os.environ.get("FIS_MF_CONFIG")
+
+# Hand-picked membership functions: term -> (shape, breakpoints). Same as MEMBERSHIP_FUNCTIONS
+# of lib/services/FIS.py, so both servers derive the same version from a configuration
+MEMBERSHIP_FUNCTIONS = {
+    "poverty": {
+        "low": ("trimf", [0, 5, 15]),
+        "medium": ("trapmf", [10, 15, 40, 50]),
+        "high": ("trimf", [40, 50, 60])
+    },
+    "education": {
+        "below_upper": ("trimf", [0, 0, 33]),
+        "upper_second": ("trimf", [25, 50, 75]),
+        "tertiary": ("trimf", [67, 100, 100])
+    },
+    "employment": {
+        "low": ("trimf", [0, 15, 20]),
+        "medium": ("trapmf", [18, 25, 45, 50]),
+        "high": ("trimf", [50, 65, 80])
+    },
+    "eligibility": {
+        "low": ("trimf", [0, 0, 50]),
+        "medium": ("trimf", [25, 50, 75]),
+        "high": ("trimf", [50, 100, 100])
+    },
+    "scholarship_type": {
+        "vocational": ("trimf", [0, 0, 50]),
+        "academic": ("trimf", [25, 50, 75]),
+        "research": ("trimf", [50, 100, 100])
+    }
+}
+
+def membership_functions_version(membership_functions):
+    """Short hash identifying a set of membership functions, as in lib/services/FIS.py"""
+    return hashlib.sha256(json.dumps(membership_functions, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+def merge_membership_functions(overrides):
+    """
+    Replace some hand-picked membership functions, with the same checks as
+    merge_membership_functions in lib/services/FIS.py.
+
+    Raises:
+        ValueError: If a variable, term or shape is unknown, or the number of breakpoints
+            does not match the shape
+    """
+    membership_functions = {variable: dict(terms) for variable, terms in MEMBERSHIP_FUNCTIONS.items()}
+    for variable, terms in overrides.items():
+        if variable not in membership_functions:
+            raise ValueError(f"Unknown fuzzy variable: {variable}")
+        for term, (shape, params) in terms.items():
+            if term not in membership_functions[variable]:
+                raise ValueError(f"Unknown term {term} of {variable}")
+            if shape not in ("trimf", "trapmf"):
+                raise ValueError(f"Unsupported membership function shape: {shape}")
+            size = 3 if shape == "trimf" else 4
+            if len(params) != size:
+                raise ValueError(f"{shape} of {variable} {term} needs {size} breakpoints")
+            membership_functions[variable][term] = (shape, [float(p) for p in params])
+    return membership_functions
+
+def load_membership_functions(path=FIS_MF_CONFIG):
+    """Return the membership functions of the tuned configuration, or the hand-picked ones when not configured"""
+    if not path:
+        return MEMBERSHIP_FUNCTIONS
+    with open(path) as f:
+        config = json.load(f)
+    return merge_membership_functions(config["membership_functions"])
+
+FIS_MEMBERSHIP_FUNCTIONS = load_membership_functions()
+# Hash of the membership functions in use, the same as FuzzyInferenceSystem.version of lib/services
+FIS_VERSION = membership_functions_version(FIS_MEMBERSHIP_FUNCTIONS) if FIS_MF_CONFIG else "builtin"
+
 # Create a FastAPI instance
 app = FastAPI(title="Scholar Jim FIS API", 
               description="API for Fuzzy Inference System for scholarship eligibility evaluation")
@@ -32,6 +155,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-File", "X-Profile-Duration"],
 )
 
 # Define the request model
@@ -46,114 +170,226 @@ class ScholarshipResponse(BaseModel):
     scholarship_type: str
     scholarship_type_scores: Dict[str, float]
 
-# Create input variables
-poverty = ctrl.Antecedent(np.arange(0, 61, 1), 'poverty')
-education = ctrl.Antecedent(np.arange(0, 101, 1), 'education')
-employment = ctrl.Antecedent(np.arange(0, 81, 1), 'employment')
-
-# Create output variables
-eligibility = ctrl.Consequent(np.arange(0, 101, 1), 'eligibility')
-scholarship_type = ctrl.Consequent(np.arange(0, 101, 1), 'scholarship_type')
-
-# Membership functions for poverty
-poverty['low'] = fuzz.trimf(poverty.universe, [0, 5, 15])
-poverty['medium'] = fuzz.trapmf(poverty.universe, [10, 15, 40, 50])
-poverty['high'] = fuzz.trimf(poverty.universe, [40, 50, 60])
-
-# Membership functions for education
-education['below_upper'] = fuzz.trimf(education.universe, [0, 0, 33])
-education['upper_second'] = fuzz.trimf(education.universe, [25, 50, 75])
-education['tertiary'] = fuzz.trimf(education.universe, [67, 100, 100])
-
-# Membership functions for employment
-employment['low'] = fuzz.trimf(employment.universe, [0, 15, 20])
-employment['medium'] = fuzz.trapmf(employment.universe, [18, 25, 45, 50])
-employment['high'] = fuzz.trimf(employment.universe, [50, 65, 80])
-
-# Membership functions for eligibility score
-eligibility['low'] = fuzz.trimf(eligibility.universe, [0, 0, 50])
-eligibility['medium'] = fuzz.trimf(eligibility.universe, [25, 50, 75])
-eligibility['high'] = fuzz.trimf(eligibility.universe, [50, 100, 100])
-
-# Membership functions for scholarship type
-scholarship_type['vocational'] = fuzz.trimf(scholarship_type.universe, [0, 0, 50])
-scholarship_type['academic'] = fuzz.trimf(scholarship_type.universe, [25, 50, 75])
-scholarship_type['research'] = fuzz.trimf(scholarship_type.universe, [50, 100, 100])
-
-# Rules for eligibility score
-rule1_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], eligibility['high'])
-rule2_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], eligibility['high'])
-rule3_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['medium'])
-rule4_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], eligibility['high'])
-rule5_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], eligibility['medium'])
-rule6_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], eligibility['medium'])
-rule7_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], eligibility['high'])
-rule8_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], eligibility['medium'])
-rule9_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], eligibility['medium'])
-rule10_e = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['low'], eligibility['high'])
-rule11_e = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['medium'], eligibility['high'])
-rule12_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['medium'])
-rule13_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['low'], eligibility['high'])
-rule14_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['medium'], eligibility['medium'])
-rule15_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['high'], eligibility['low'])
-rule16_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['low'], eligibility['high'])
-rule17_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['medium'], eligibility['medium'])
-rule18_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['high'], eligibility['low'])
-rule19_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], eligibility['medium'])
-rule20_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], eligibility['medium'])
-rule21_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['low'])
-rule22_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], eligibility['medium'])
-rule23_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], eligibility['medium'])
-rule24_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], eligibility['low'])
-rule25_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], eligibility['low'])
-rule26_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], eligibility['medium'])
-rule27_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], eligibility['low'])
-# Add more rules as needed
-
-# Rules for scholarship type
-rule1_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
-rule2_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
-rule3_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
-rule4_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
-rule5_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
-rule6_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
-rule7_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], scholarship_type['research'])
-rule8_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
-rule9_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], scholarship_type['research'])
-rule10_s = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
-rule11_s = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
-rule12_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
-rule13_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
-rule14_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
-rule15_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
-rule16_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['low'], scholarship_type['research'])
-rule17_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
-rule18_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['high'], scholarship_type['research'])
-rule19_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
-rule20_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
-rule21_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
-rule22_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
-rule23_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
-rule24_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
-rule25_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], scholarship_type['research'])
-rule26_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
-rule27_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], scholarship_type['research'])
-# Add more rules as needed
-
-# Creating control systems
-eligibility_ctrl = ctrl.ControlSystem([rule1_e, rule2_e, rule3_e, rule4_e, rule5_e, rule6_e, rule7_e, rule8_e,
-                                       rule9_e, rule10_e, rule11_e, rule12_e, rule13_e, rule14_e, rule15_e, rule16_e,
-                                       rule17_e, rule18_e, rule19_e, rule20_e, rule21_e, rule22_e, rule23_e, rule24_e,
-                                       rule25_e, rule26_e, rule27_e])
-
-scholarship_ctrl = ctrl.ControlSystem([rule1_s, rule2_s, rule3_s, rule4_s, rule5_s, rule6_s, rule7_s, rule8_s,
-                                       rule9_s, rule10_s, rule11_s, rule12_s, rule13_s, rule14_s, rule15_s, rule16_s,
-                                       rule17_s, rule18_s, rule19_s, rule20_s, rule21_s, rule22_s, rule23_s, rule24_s,
-                                       rule25_s, rule26_s, rule27_s])
-
-# Creating simulators
-eligibility_simulator = ctrl.ControlSystemSimulation(eligibility_ctrl)
-scholarship_simulator = ctrl.ControlSystemSimulation(scholarship_ctrl)
+def build_fuzzy_system():
+    """Create the fuzzy variables, membership functions, rules and control systems"""
+    # Create input variables
+    poverty = ctrl.Antecedent(np.arange(0, 61, 1), 'poverty')
+    education = ctrl.Antecedent(np.arange(0, 101, 1), 'education')
+    employment = ctrl.Antecedent(np.arange(0, 81, 1), 'employment')
+
+    # Create output variables
+    eligibility = ctrl.Consequent(np.arange(0, 101, 1), 'eligibility')
+    scholarship_type = ctrl.Consequent(np.arange(0, 101, 1), 'scholarship_type')
+
+    # Membership functions, hand-picked or from the tuned configuration
+    shapes = {"trimf": fuzz.trimf, "trapmf": fuzz.trapmf}
+    for variable in (poverty, education, employment, eligibility, scholarship_type):
+        for term, (shape, params) in FIS_MEMBERSHIP_FUNCTIONS[variable.label].items():
+            variable[term] = shapes[shape](variable.universe, params)
+
+    # Rules for eligibility score
+    rule1_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], eligibility['high'])
+    rule2_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], eligibility['high'])
+    rule3_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['medium'])
+    rule4_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], eligibility['high'])
+    rule5_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], eligibility['medium'])
+    rule6_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], eligibility['medium'])
+    rule7_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], eligibility['high'])
+    rule8_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], eligibility['medium'])
+    rule9_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], eligibility['medium'])
+    rule10_e = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['low'], eligibility['high'])
+    rule11_e = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['medium'], eligibility['high'])
+    rule12_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['medium'])
+    rule13_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['low'], eligibility['high'])
+    rule14_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['medium'], eligibility['medium'])
+    rule15_e = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['high'], eligibility['low'])
+    rule16_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['low'], eligibility['high'])
+    rule17_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['medium'], eligibility['medium'])
+    rule18_e = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['high'], eligibility['low'])
+    rule19_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], eligibility['medium'])
+    rule20_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], eligibility['medium'])
+    rule21_e = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], eligibility['low'])
+    rule22_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], eligibility['medium'])
+    rule23_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], eligibility['medium'])
+    rule24_e = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], eligibility['low'])
+    rule25_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], eligibility['low'])
+    rule26_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], eligibility['medium'])
+    rule27_e = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], eligibility['low'])
+    # Add more rules as needed
+
+    # Rules for scholarship type
+    rule1_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
+    rule2_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
+    rule3_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
+    rule4_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
+    rule5_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
+    rule6_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
+    rule7_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], scholarship_type['research'])
+    rule8_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
+    rule9_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], scholarship_type['research'])
+    rule10_s = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
+    rule11_s = ctrl.Rule(poverty['medium'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
+    rule12_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
+    rule13_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
+    rule14_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
+    rule15_s = ctrl.Rule(poverty['medium'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
+    rule16_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['low'], scholarship_type['research'])
+    rule17_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
+    rule18_s = ctrl.Rule(poverty['medium'] & education['tertiary'] & employment['high'], scholarship_type['research'])
+    rule19_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['low'], scholarship_type['vocational'])
+    rule20_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['medium'], scholarship_type['vocational'])
+    rule21_s = ctrl.Rule(poverty['low'] & education['below_upper'] & employment['high'], scholarship_type['vocational'])
+    rule22_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['low'], scholarship_type['academic'])
+    rule23_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['medium'], scholarship_type['academic'])
+    rule24_s = ctrl.Rule(poverty['low'] & education['upper_second'] & employment['high'], scholarship_type['academic'])
+    rule25_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['low'], scholarship_type['research'])
+    rule26_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['medium'], scholarship_type['research'])
+    rule27_s = ctrl.Rule(poverty['low'] & education['tertiary'] & employment['high'], scholarship_type['research'])
+    # Add more rules as needed
+
+    # Creating control systems
+    eligibility_ctrl = ctrl.ControlSystem([rule1_e, rule2_e, rule3_e, rule4_e, rule5_e, rule6_e, rule7_e, rule8_e,
+                                           rule9_e, rule10_e, rule11_e, rule12_e, rule13_e, rule14_e, rule15_e, rule16_e,
+                                           rule17_e, rule18_e, rule19_e, rule20_e, rule21_e, rule22_e, rule23_e, rule24_e,
+                                           rule25_e, rule26_e, rule27_e])
+
+    scholarship_ctrl = ctrl.ControlSystem([rule1_s, rule2_s, rule3_s, rule4_s, rule5_s, rule6_s, rule7_s, rule8_s,
+                                           rule9_s, rule10_s, rule11_s, rule12_s, rule13_s, rule14_s, rule15_s, rule16_s,
+                                           rule17_s, rule18_s, rule19_s, rule20_s, rule21_s, rule22_s, rule23_s, rule24_s,
+                                           rule25_s, rule26_s, rule27_s])
+
+    return {
+        'poverty': poverty,
+        'education': education,
+        'employment': employment,
+        'eligibility': eligibility,
+        'scholarship_type': scholarship_type,
+        'eligibility_ctrl': eligibility_ctrl,
+        'scholarship_ctrl': scholarship_ctrl
+    }
+
+def snapshot_fingerprint():
+    """Identifies the system definition, membership functions and library versions a snapshot was built with"""
+    source = inspect.getsource(build_fuzzy_system)
+    membership_functions = json.dumps(FIS_MEMBERSHIP_FUNCTIONS, sort_keys=True)
+    return hashlib.sha256(f"{source}|{membership_functions}|{skfuzzy.__version__}|{np.__version__}".encode()).hexdigest()
+
+def build_snapshot(path=FIS_SNAPSHOT):
+    """Serialize the compiled fuzzy system, run at image build time"""
+    with open(path, 'wb') as f:
+        pickle.dump({'fingerprint': snapshot_fingerprint(), 'system': build_fuzzy_system()}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def load_fuzzy_system(path=FIS_SNAPSHOT):
+    """
+    Load the compiled fuzzy system from the snapshot, or build it if the snapshot
+    is missing or was built from a different definition.
+
+    Returns:
+        tuple: (system dict, 'snapshot' or 'built')
+    """
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+            if snapshot.get('fingerprint') == snapshot_fingerprint():
+                return snapshot['system'], 'snapshot'
+            logger.warning(f"Ignoring outdated FIS snapshot {path}")
+        except Exception as e:
+            logger.warning(f"Could not load FIS snapshot {path}: {str(e)}")
+    return build_fuzzy_system(), 'built'
+
+_stage_started = time.perf_counter()
+_system, _system_source = load_fuzzy_system()
+STARTUP_TIMINGS['fuzzy_system'] = time.perf_counter() - _stage_started
+STARTUP_TIMINGS['fuzzy_system_source'] = _system_source
+
+poverty = _system['poverty']
+education = _system['education']
+employment = _system['employment']
+eligibility = _system['eligibility']
+scholarship_type = _system['scholarship_type']
+eligibility_ctrl = _system['eligibility_ctrl']
+scholarship_ctrl = _system['scholarship_ctrl']
+
+# Per-thread simulators. skfuzzy keeps intermediate results on the shared terms of a
+# control system, so every worker thread evaluates on its own copy of the systems.
+_thread_state = threading.local()
+
+def get_simulators():
+    """Return the (eligibility, scholarship) simulators of the current thread"""
+    if not hasattr(_thread_state, "simulators"):
+        _thread_state.simulators = (
+            ctrl.ControlSystemSimulation(copy.deepcopy(eligibility_ctrl)),
+            ctrl.ControlSystemSimulation(copy.deepcopy(scholarship_ctrl))
+        )
+    return _thread_state.simulators
+
+class DeadlineExceeded(Exception):
+    pass
+
+class AdmissionController:
+    """
+    Runs CPU-bound work on a bounded thread pool so the event loop stays free.
+
+    Requests beyond the worker and queue capacity are rejected immediately with
+    429, and requests that miss their deadline get 503. Both carry Retry-After.
+    The in-flight count is only touched from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, workers, max_queue, deadline_seconds, retry_after_seconds):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fis-worker")
+        self.capacity = workers + max_queue
+        self.deadline_seconds = deadline_seconds
+        self.retry_after = str(retry_after_seconds)
+        self.in_flight = 0
+
+    def _release(self, future):
+        self.in_flight -= 1
+        if not future.cancelled():
+            # Mark the exception as retrieved when nobody awaited the result anymore
+            future.exception()
+
+    @staticmethod
+    def _run_before_deadline(deadline, func, args):
+        # Skip work that waited in the queue past its deadline
+        if time.monotonic() > deadline:
+            raise DeadlineExceeded()
+        return func(*args)
+
+    async def run(self, func, *args, deadline_seconds=None):
+        if self.in_flight >= self.capacity:
+            logger.warning(f"Rejecting request: {self.in_flight} evaluations in flight")
+            raise HTTPException(status_code=429, detail="Server is busy, please retry later",
+                                headers={"Retry-After": self.retry_after})
+
+        timeout = self.deadline_seconds
+        if deadline_seconds is not None:
+            timeout = max(0.0, min(deadline_seconds, self.deadline_seconds))
+
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._run_before_deadline,
+                                      time.monotonic() + timeout, func, args)
+        # Released when the work really finishes, not when the request gives up on it
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            logger.warning(f"Evaluation deadline of {timeout}s exceeded")
+            raise HTTPException(status_code=503, detail="Evaluation deadline exceeded",
+                                headers={"Retry-After": self.retry_after})
+
+admission = AdmissionController(FIS_WORKERS, FIS_MAX_QUEUE, FIS_DEADLINE_SECONDS, FIS_RETRY_AFTER_SECONDS)
+
+def profiled(profiler, func):
+    """Wrap func so the profiler samples the worker thread that runs it"""
+    def run(*args):
+        with profiler:
+            return func(*args)
+    return run
 
 def evaluate_scholarship(poverty_val, education_val, employment_val):
     try:
@@ -170,6 +406,8 @@ def evaluate_scholarship(poverty_val, education_val, employment_val):
         if not (0 <= employment_val <= 80):
             logger.warning(f"Invalid employment value: {employment_val}")
             raise ValueError("Employment value must be between 0 and 80")
+
+        eligibility_simulator, scholarship_simulator = get_simulators()
             
         # Evaluate eligibility score
         eligibility_simulator.input['poverty'] = poverty_val
@@ -220,57 +458,87 @@ def evaluate_scholarship(poverty_val, education_val, employment_val):
 
 # FastAPI endpoint to evaluate scholarship
 @app.post("/evaluate", response_model=ScholarshipResponse)
-async def api_evaluate_scholarship(request: ScholarshipRequest):
+async def api_evaluate_scholarship(request: ScholarshipRequest,
+                                   response: Response,
+                                   x_deadline_ms: Optional[int] = Header(None),
+                                   x_profile: Optional[str] = Header(None),
+                                   x_admin_token: Optional[str] = Header(None),
+                                   profile: Optional[str] = Query(None)):
     try:
         # Log the incoming request
         logger.info(f"Received evaluation request: {request.dict()}")
         
-        result = evaluate_scholarship(
-            poverty_val=request.poverty_val,
-            education_val=request.education_val,
-            employment_val=request.employment_val
+        # Opt-in profiling of this request (PROFILING_ENABLED or admin token)
+        profile_mode = requested_mode(x_profile or profile, x_admin_token)
+        profiler = SamplingProfiler() if profile_mode else None
+        
+        # Run on the worker pool; the client may ask for a shorter deadline
+        result = await admission.run(
+            profiled(profiler, evaluate_scholarship) if profiler else evaluate_scholarship,
+            request.poverty_val,
+            request.education_val,
+            request.employment_val,
+            deadline_seconds=x_deadline_ms / 1000 if x_deadline_ms is not None else None
         )
         
         # Log the response
         logger.info(f"Sending response: {result}")
         
+        if profile_mode == "return":
+            return PlainTextResponse(profiler.collapsed(),
+                                     headers={"X-Profile-Duration": f"{profiler.duration:.6f}"})
+        if profile_mode == "store":
+            response.headers["X-Profile-File"] = profiler.save("evaluate")
+            response.headers["X-Profile-Duration"] = f"{profiler.duration:.6f}"
+            logger.info(f"Stored request profile in {response.headers['X-Profile-File']}")
+        
         return result
     except ValueError as e:
         logger.error(f"Request error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+# pyplot keeps global state, so only one thread may draw at a time
+_plot_lock = threading.Lock()
+
+def render_membership(variable):
+    """Render the membership functions of a variable as a base64 PNG"""
+    import io
+    import base64
+    plt = use_matplotlib()
+    
+    with _plot_lock:
+        plt.figure(figsize=(10, 5))
+        variable.view()
+        
+        # Save plot to bytes buffer
+        buf = io.BytesIO()
+        plt.savefig(buf, format='png')
+        buf.seek(0)
+        
+        # Convert to base64
+        img_str = base64.b64encode(buf.read()).decode('utf-8')
+        plt.close()
+    
+    return img_str
+
 # Optional: Endpoint to get membership function visualizations as base64 images
 @app.get("/visualize/{variable}")
 async def visualize_membership(variable: str):
     logger.info(f"Visualization request for variable: {variable}")
     
-    import io
-    import base64
-    
-    plt.figure(figsize=(10, 5))
-    
-    if variable == "poverty":
-        poverty.view()
-    elif variable == "education":
-        education.view()
-    elif variable == "employment":
-        employment.view()
-    elif variable == "eligibility":
-        eligibility.view()
-    elif variable == "scholarship_type":
-        scholarship_type.view()
-    else:
+    variables = {
+        "poverty": poverty,
+        "education": education,
+        "employment": employment,
+        "eligibility": eligibility,
+        "scholarship_type": scholarship_type
+    }
+    if variable not in variables:
         logger.warning(f"Invalid visualization variable requested: {variable}")
         raise HTTPException(status_code=404, detail=f"Variable {variable} not found")
     
-    # Save plot to bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    
-    # Convert to base64
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
+    # Rendering is CPU-bound too, so it goes through the worker pool
+    img_str = await admission.run(render_membership, variables[variable])
     
     logger.info(f"Generated visualization for {variable} (image length: {len(img_str)} chars)")
     
@@ -280,21 +548,29 @@ async def visualize_membership(variable: str):
 @app.on_event("startup")
 async def startup_event():
     logger.info("=== FIS API Server Starting ===")
+    logger.info(f"Startup timings: {json.dumps(STARTUP_TIMINGS)}")
     logger.info(f"Server time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("CORS enabled with allow_origins=*")
+    logger.info(f"Admission control: {FIS_WORKERS} workers, queue of {FIS_MAX_QUEUE}, deadline {FIS_DEADLINE_SECONDS}s")
     logger.info("Ready to accept requests")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("=== FIS API Server Shutting Down ===")
+    admission.executor.shutdown(wait=False)
 
-# Health check endpoint for Cloud Run
+# Health check endpoint for Cloud Run. It never touches the worker pool,
+# so it answers even when every worker is busy.
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "fis_version": FIS_VERSION}
 
 # Run the API server when executed directly
 if __name__ == "__main__":
+    if "--build-snapshot" in sys.argv:
+        logger.info(f"Wrote FIS snapshot to {build_snapshot()}")
+        sys.exit(0)
+    
     # Get port from environment variable for Cloud Run
     port = int(os.environ.get("PORT", 8000))
     
@@ -0,0 +1,93 @@
+"""
+Measure the cold start of the FIS API, broken down by stage.
+
+Every run starts a fresh interpreter that imports FIS.py the way uvicorn does and
+evaluates one request. Runs are repeated with and without the prebuilt snapshot,
+and one extra run with -X importtime attributes the import stage to packages.
+
+Usage:
+    python FIS.py --build-snapshot
+    python measure_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside the child interpreter
+CHILD = """
+import json, time
+started = time.perf_counter()
+import FIS
+imported = time.perf_counter()
+FIS.evaluate_scholarship(25.0, 50.0, 40.0)
+timings = dict(FIS.STARTUP_TIMINGS)
+timings['import_total'] = imported - started
+timings['first_evaluation'] = time.perf_counter() - imported
+print('TIMINGS ' + json.dumps(timings))
+"""
+
+STAGES = ('imports', 'fuzzy_system', 'import_total', 'first_evaluation')
+
+
+def run_child(env, extra_args=()):
+    completed = subprocess.run(
+        [sys.executable, *extra_args, '-c', CHILD],
+        cwd=SCRIPT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith('TIMINGS '):
+            return json.loads(line[len('TIMINGS '):]), completed.stderr
+    raise RuntimeError(f'No timings in output:\n{completed.stdout}\n{completed.stderr}')
+
+
+def measure(runs, use_snapshot):
+    env = dict(os.environ)
+    if not use_snapshot:
+        env['FIS_SNAPSHOT'] = ''
+
+    samples = [run_child(env)[0] for _ in range(runs)]
+    sources = {sample['fuzzy_system_source'] for sample in samples}
+    return {
+        'source': ', '.join(sorted(sources)),
+        'median': {stage: statistics.median(sample[stage] for sample in samples) for stage in STAGES},
+        'max': {stage: max(sample[stage] for sample in samples) for stage in STAGES}
+    }
+
+
+def import_breakdown(top=10):
+    """Cumulative import time of the packages imported directly by FIS.py"""
+    _, stderr = run_child(dict(os.environ), ('-X', 'importtime'))
+    totals = {}
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', line)
+        # Nesting level 1 (three spaces): imported by FIS.py itself
+        if match and len(match.group(2)) == 3:
+            totals[match.group(3)] = totals.get(match.group(3), 0) + int(match.group(1))
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure FIS API cold start by stage')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per configuration')
+    args = parser.parse_args(argv)
+
+    print(f"{'configuration':<18}{'fuzzy system':<14}" + ''.join(f'{stage:>18}' for stage in STAGES))
+    for label, use_snapshot in (('with snapshot', True), ('without snapshot', False)):
+        result = measure(args.runs, use_snapshot)
+        cells = ''.join(f"{result['median'][stage] * 1000:>15.1f} ms" for stage in STAGES)
+        print(f"{label:<18}{result['source']:<14}{cells}")
+    print(f'(median of {args.runs} runs)')
+
+    print('\nSlowest imports (cumulative):')
+    for module, microseconds in import_breakdown():
+        print(f'  {module:<40}{microseconds / 1000:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()